@@ -17,7 +17,7 @@
 # has been updated.
 
 '''
-This module exposes 11 functions and 2 classes to obtain lengths and
+This module exposes 19 functions and 6 classes to obtain lengths and
 sizes of Python objects (for Python 3.6 or later).
 
 Earlier versions of this module supported Python versions down to
@@ -36,6 +36,34 @@ downgrading Pympler.
    **Asized** containing all the size information of the object and
    a tuple with the referents [#refs]_.
 
+   Function **aretained** returns an instance of class **Aretained**
+   with the dominator tree of all objects reachable from the given
+   objects and the *retained size* of each object and type, i.e. the
+   size freed if that object or all instances of that type were
+   released.
+
+   Function **abaseline** returns an instance of class **Abaseline**
+   with the ids of all objects reachable from all modules or other
+   long-lived roots, computed once.  Sizing with option *baseline*
+   then skips those objects and only sizes the objects owned by the
+   given objects.
+
+   Function **amodules** returns the size of all objects reachable
+   from each module only, i.e. owned exclusively by that module, and
+   the size of the objects shared with other modules.
+
+   Function **ashared** returns the size exclusive to each of several
+   objects and the size shared by each subset or by each pair of those
+   objects, found in one traversal.
+
+   Function **apaths** returns the heaviest reference paths from
+   an object, each as an **Asized** instance with a single referent
+   per level, found in one sizing.
+
+   Function **atasks** returns the size of every task of an asyncio
+   event loop, including its coroutine chain, optionally per coroutine
+   name.
+
    Functions **basicsize** and **itemsize** return the *basic-*
    respectively *itemsize* of the given object, both in bytes.  For
    objects as ``array.array``, ``numpy.array``, ``numpy.ndarray``,
@@ -60,7 +88,9 @@ downgrading Pympler.
 
    Certain classes are known to be sub-classes of or to behave as
    ``dict`` objects.  Function **adict** can be used to register
-   other class objects to be treated like ``dict``.
+   other class objects to be treated like ``dict``.  Function
+   **aregister** registers how to size instances of other classes,
+   like those of third-party packages.
 
 **Public Classes** [#unsafe]_
 
@@ -155,7 +185,9 @@ downgrading Pympler.
    [#bi]_, function globals and module referents.  However, any
    instances thereof and module objects will be sized when passed as
    given objects.  Ignored object types are included unless option
-   *ignored* is set accordingly.
+   *ignored* is set accordingly.  Immortal and interned objects and
+   other objects owned by the interpreter are skipped if option
+   *immortal* is False.
 
    In addition, many ``__...__`` attributes of callable objects are
    ignored [#arb]_, except crucial ones, e.g. class attributes ``__dict__``,
@@ -189,15 +221,33 @@ if sys.version_info < (3, 6, 0):
 from typing import Callable, Dict, List, Set, Union  # Optional
 
 # all imports listed explicitly to help PyChecker
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from fnmatch import fnmatchcase
 from inspect import (isbuiltin, isclass, iscode, isframe, isfunction,
                      ismethod, ismodule)  # stack
-from math import log
-from os import curdir, linesep
+from heapq import heappush, heapreplace, nlargest
+from itertools import accumulate, chain, islice, repeat
+from marshal import dumps as _dumps, loads as _loads
+from math import log, sqrt
+from operator import itemgetter, length_hint
+from os import _exit, close, curdir, fdopen, linesep, pipe, waitpid
+from random import randrange, sample as _random_sample
+from reprlib import Repr as _Repr
 from struct import calcsize  # type/class Struct only in Python 2.5+
+import threading
+from time import monotonic as _timer
 import types as Types
 import warnings
 import weakref as Weakref
 
+try:
+    from os import fork as _fork, kill, read
+    from select import select
+    from signal import SIGKILL
+except ImportError:  # Windows
+    _fork = None
+
 __all__ = []  # overwritten below
 __version__ = '22.12.07'  # 22.06.30
 
@@ -328,6 +378,16 @@ def _classof(obj, dflt=None):
     return getattr(obj, '__class__', dflt)
 
 
+def _clip(r, clip=80):
+    '''Clip a long string.
+    '''
+    if len(r) > clip > 0:
+        h = (clip // 2) - 2
+        if h > 0:
+            r = r[:h] + '....' + r[-h:]
+    return r
+
+
 def _derive_typedef(typ):
     '''Return single, existing super type typedef or None.
     '''
@@ -338,7 +398,7 @@ def _derive_typedef(typ):
 def _dir2(obj, pref=_NN, excl=(), slots=None, itor=_NN):
     '''Return an attribute name, object 2-tuple for certain
        attributes or for the ``__slots__`` attributes of the
-       given object, but not both.  Any iterator referent
+       given object, but not both and not those in *excl*.  Any iterator referent
        objects are returned with the given name if the
        latter is non-empty.
     '''
@@ -351,6 +411,8 @@ def _dir2(obj, pref=_NN, excl=(), slots=None, itor=_NN):
             for c in type(obj).mro():
                 n = _nameof(c)
                 for a in getattr(c, slots, ()):
+                    if a in excl:
+                        continue
                     if a.startswith('__'):
                         a = '_' + n + a
                     if hasattr(obj, a):
@@ -410,12 +472,40 @@ def _isframe(obj):
         return False
 
 
+def _isfrozen(typ):
+    '''Return True for a frozen dataclass.
+    '''
+    p = getattr(typ, '__dataclass_params__', None)
+    return bool(p and getattr(p, 'frozen', False))
+
+
+def _isfuture(typ):
+    '''Is this an asyncio future or task class, by duck typing
+       like ``asyncio.isfuture``, without importing asyncio?
+    '''
+    return getattr(typ, '_asyncio_future_blocking', None) is not None
+
+
 def _isignored(typ):
     '''Is this a type or class to be ignored?
     '''
     return _moduleof(typ) in _ignored_modules
 
 
+def _isimmortal(obj):
+    '''Is *obj* immortal, interned or otherwise owned by the
+       interpreter, see option *immortal* and *_immortal_types*?
+    '''
+    if id(obj) in _immortal_ids:
+        return True
+    t = type(obj)
+    if t is int:  # cached small ints
+        return -5 <= obj <= 256
+    if _is_immortal and _is_immortal(obj):
+        return True
+    return bool(t is str and _is_interned and _is_interned(obj))
+
+
 def _isnamedtuple(obj):
     '''Named tuples are identified via duck typing:
        <http://www.Gossamer-Threads.com/lists/python/dev/1142178>
@@ -434,6 +524,16 @@ def _isNULL(obj):
                                   and repr(obj) == '(<NULL>,)'
 
 
+def _issizeof(typ):
+    '''Return True if *typ* has a built-in ``__sizeof__``
+       method, i.e. ``sys.getsizeof`` is accurate for *typ*.
+    '''
+    return isinstance(getattr(typ, '__sizeof__', None), _sizeof_types)
+
+
+_sizeof_types = type(object.__sizeof__),  # method_descriptor
+
+
 def _issubclass(obj, Super):
     '''Safe inspect.issubclass() returning None if Super is
        *object* or if obj and Super are not a class or type.
@@ -471,6 +571,71 @@ def _lengstr(obj):
     return r
 
 
+# names of Asized referents using the default repr are kept as
+# tuples and formatted only when used, see Asized.name, _lazyname
+# and _lazyrepr, but without referencing the referents
+_atomic_types = {bool, bytes, complex, float, int, str, type(None)}
+_object_repr  = object.__repr__
+
+
+def _lazyname(name):
+    '''Format a lazy name tuple from _lazyrepr or _dict_refs.
+    '''
+    if name[0] == 'V':  # dict value
+        return name[1] + _lazyname(name[2:])
+    # default object.__repr__ from type and id
+    t = name[1]
+    m, n = _moduleof(t), t.__qualname__
+    if m and m != 'builtins':
+        n = '%s.%s' % (m, n)
+    return _clip('<%s object at %#x>' % (n, name[2]), name[3])
+
+
+def _lazyrepr(obj, clip=80):
+    '''Return the ``repr()`` of an object or a lazy name tuple
+       for objects using the default repr, not referencing *obj*.
+    '''
+    t = type(obj)
+    if t in _atomic_types:
+        return _repr(obj, clip=clip)
+    elif t.__repr__ is _object_repr:
+        return 'O', t, id(obj), clip
+    return _repr(obj, clip=clip)
+
+
+def _matcher(where, preds):
+    '''Return a callable returning True for a type or class matching
+       any module name pattern, base class or callable of *preds* or
+       None if there are no *preds*, see option *exclude*.
+    '''
+    ms, bs, fs = [], [], []
+    for p in preds:
+        if isinstance(p, str):
+            ms.append(p)
+            if p.endswith('.*'):  # incl. the package
+                ms.append(p[:-2])
+        elif isclass(p):
+            bs.append(p)
+        elif callable(p):
+            fs.append(p)
+        else:
+            raise _OptionError(where, exclude=preds)
+    if not (ms or bs or fs):
+        return None
+    bs = tuple(bs)
+
+    def f(t):
+        if ms:
+            m = _moduleof(t)
+            if any(fnmatchcase(m, p) for p in ms):
+                return True
+        if bs and _issubclass(t, bs):
+            return True
+        return any(p(t) for p in fs)
+
+    return f
+
+
 def _moduleof(obj, dflt=_NN):
     '''Return the object's module name.
     '''
@@ -558,6 +723,14 @@ def _printf(fmt, *args, **print3options):
         print(fmt)
 
 
+def _qualname(task):
+    '''Return the qualified name of the coroutine of an asyncio task.
+    '''
+    c = getattr(task, 'get_coro', None)
+    c = c() if c else None
+    return getattr(c, '__qualname__', None) or _nameof(type(c))
+
+
 def _refs(obj, named, *attrs, **kwds):
     '''Return specific attribute objects of an object.
     '''
@@ -575,18 +748,30 @@ def _refs(obj, named, *attrs, **kwds):
             yield _N(a, o)
 
 
+_reprs = {}  # bounded reprlib.Repr by clip, see _repr
+
+
 def _repr(obj, clip=80):
-    '''Clip long repr() string.
+    '''Clip long repr() string, bounded for *clip* > 0.
     '''
     try:  # safe repr()
-        r = repr(obj).replace(linesep, '\\n')
+        if clip <= 0:
+            r = repr(obj)
+        elif type(obj) in (bytes, str) and len(obj) > clip * 2:
+            # repr() of the head and tail only, clipped below
+            r, t = repr(obj[:clip]), repr(obj[-clip:])
+            r = r[:-1] + t[t.index(t[-1]) + 1:]
+        else:  # at most a few items of a few container levels
+            r = _reprs.get(clip, None)
+            if r is None:
+                _reprs[clip] = r = _Repr()
+                r.maxlevel = 3
+                r.maxlong = r.maxother = r.maxstring = clip * 2
+            r = r.repr(obj)
+        r = r.replace(linesep, '\\n')
     except Exception:
         r = 'N/A'
-    if len(r) > clip > 0:
-        h = (clip // 2) - 2
-        if h > 0:
-            r = r[:h] + '....' + r[-h:]
-    return r
+    return _clip(r, clip)
 
 
 def _SI(size, K=1024, i='i'):
@@ -637,12 +822,16 @@ def _dict_refs(obj, named):
     '''Return key and value objects of a dict/proxy.
     '''
     try:
-        if named:
+        if named:  # lazy names, see Asized.name
             for k, v in _items(obj):
-                s  = str(k)
+                s = _clip(k) if type(k) is str else _repr(k)
                 yield _NamedRef('[K] ' + s, k)
-                s += ': ' + _repr(v)
-                yield _NamedRef('[V] ' + s, v)
+                n = _lazyrepr(v)
+                if type(n) is tuple:
+                    n = ('V', '[V] %s: ' % (s,)) + n
+                else:
+                    n = '[V] %s: %s' % (s, n)
+                yield _NamedRef(n, v)
         else:
             for k, v in _items(obj):
                 yield k
@@ -651,6 +840,12 @@ def _dict_refs(obj, named):
         warnings.warn("Iterating '%s': %r" % (_classof(obj), x))
 
 
+def _dict_items(obj):  # dict only
+    '''Return an iterator over the key and value objects of a dict.
+    '''
+    return chain.from_iterable(obj.items())
+
+
 def _enum_refs(obj, named):
     '''Return specific referents of an enumerate object.
     '''
@@ -683,13 +878,35 @@ def _func_refs(obj, named):
                  pref='func_', excl=('func_globals',))
 
 
+def _future_refs(obj, named):
+    '''Return specific referents of an asyncio future or task,
+       excluding the event loop.
+    '''
+    for r in _inst_refs(obj, named):
+        yield r
+    for a in ('_coro', '_fut_waiter', '_result', '_exception', '_callbacks'):
+        o = getattr(obj, a, None)
+        if o is not None:
+            yield _NamedRef(a, o) if named else o
+
+
 def _gen_refs(obj, named):
-    '''Return the referent(s) of a generator (expression) object.
+    '''Return the referent(s) of a generator (expression),
+       coroutine or asynchronous generator object.
     '''
     # only some gi_frame attrs, but none of
     # the items to keep the generator intact
-    f = getattr(obj, 'gi_frame', None)
-    return _refs(f, named, 'f_locals', 'f_code')
+    for a in ('gi_frame', 'cr_frame', 'ag_frame'):
+        f = getattr(obj, a, None)
+        if f is not None:
+            break
+    for r in _refs(f, named, 'f_locals', 'f_code'):
+        yield r
+    # the awaited or delegated-to object, if any
+    for a in ('cr_await', 'ag_await', 'gi_yieldfrom'):
+        o = getattr(obj, a, None)
+        if o is not None:
+            yield _NamedRef(a, o) if named else o
 
 
 def _im_refs(obj, named):
@@ -704,6 +921,17 @@ def _inst_refs(obj, named):
     return _refs(obj, named, '__dict__', '__class__', slots='__slots__')
 
 
+def _managed_refs(obj, named):
+    '''Return specific referents of a class instance with a
+       managed __dict__, but not the values not in a dict, see
+       function _managed_items.
+    '''
+    if _values_addr(obj):  # don't materialize the __dict__
+        return _refs(obj, named, '__class__', slots='__slots__',
+                                 excl=('__dict__',))
+    return _inst_refs(obj, named)
+
+
 def _iter_refs(obj, named):
     '''Return the referent(s) of an iterator object.
     '''
@@ -711,6 +939,16 @@ def _iter_refs(obj, named):
     return _refs(r, named, itor=_nameof(obj) or 'iteref')
 
 
+def _memoryview_refs(obj, named):
+    '''Return the exporter of a memoryview object.
+    '''
+    try:
+        o = obj.obj
+    except ValueError:  # released
+        return ()
+    return (_NamedRef('obj', o),) if named else (o,)
+
+
 def _module_refs(obj, named):
     '''Return specific referents of a module object.
     '''
@@ -775,8 +1013,10 @@ def _weak_refs(obj, unused):  # unused for named
 
 
 _all_refs = {None, _cell_refs, _class_refs, _co_refs, _dict_refs, _enum_refs,
-                   _exc_refs, _file_refs, _frame_refs, _func_refs, _gen_refs,
-                   _im_refs, _inst_refs, _iter_refs, _module_refs, _namedtuple_refs,
+                   _exc_refs, _file_refs, _frame_refs, _func_refs, _future_refs, _gen_refs,
+                   _im_refs, _inst_refs, _iter_refs, _managed_refs, _memoryview_refs,
+                   _module_refs,
+                   _namedtuple_refs,
                    _prop_refs, _seq_refs, _stat_refs, _statvfs_refs, _tb_refs,
                    _type_refs, _weak_refs}  # type: Set[Union[None, Callable], ...]
 
@@ -955,7 +1195,7 @@ def _claskey(obj):
 def _key2tuple(obj):  # PYCHOK expected
     '''Return class and instance keys for a class.
     '''
-    t = type(obj) is _Type_type  # isclass(obj):
+    t = isinstance(obj, _Type_type)  # incl. metaclasses
     return (_claskey(obj), obj) if t else _NoneNone
 
 
@@ -1003,6 +1243,7 @@ class _Typedef(object):
     '''
     base = 0     # basic size in bytes
     both = None  # both data and code if True, code only if False
+    fast = None  # compiled (flat, refs) callables, see _compile
     item = 0     # item size in bytes
     kind = None  # _kind_... value
     leng = None  # _len_...() function or None
@@ -1028,6 +1269,51 @@ class _Typedef(object):
             t.append('(code only)')
         return ', '.join(t)
 
+    def _compile(self):
+        '''Return a callable to get the unaligned flat size and
+           a callable returning an iterator over the (unnamed)
+           referents of an object, both specialized for this
+           typedef.  The latter is None if not specialized.
+        '''
+        b, i, n = self.base, self.item, self.leng
+        if not (n and i > 0):
+            n = None
+        if self.xtyp:  # never _getsizeof'd
+            if n:
+                def f(obj):
+                    return b + n(obj) * i
+            else:
+                def f(unused):
+                    return b
+        elif self.refs is _managed_refs:  # plus values not in a dict
+
+            def f(obj):
+                return _getsizeof(obj) + _managed_values(obj)
+
+        elif _issizeof(self.type):  # accurate, ignore b, i and n
+            f = _getsizeof
+        elif n:
+            def f(obj):
+                return _getsizeof(obj, b + n(obj) * i)
+        else:
+            def f(obj):
+                return _getsizeof(obj, b)
+        r = self.refs
+        if r is _seq_refs:
+            r = iter
+        elif r is _dict_refs and self.type in (dict, type(_Typedef.__dict__)):
+            r = _dict_items  # no subclasses, no dict-like types
+        elif r is _managed_refs:  # all referents
+
+            def r(obj):  # PYCHOK redef
+                rs = _getreferents(obj)  # incl. the values
+                ks = _managed_items(obj, rs) or ()
+                return chain(rs, (k for k, _ in ks))
+
+        else:  # see Asizer._sizer
+            r = None
+        return f, r
+
     def args(self):  # as args tuple
         '''Return all attributes as arguments tuple.
         '''
@@ -1045,14 +1331,10 @@ class _Typedef(object):
     def flat(self, obj, mask=0):
         '''Return the aligned flat size.
         '''
-        s = self.base
-        if self.leng and self.item > 0:  # include items
-            s += self.leng(obj) * self.item
         # workaround sys.getsizeof bug for _array types
         # (in some Python versions) and for other types
         # with variable .itemsize like numpy.arrays, etc.
-        if not self.xtyp:
-            s = _getsizeof(obj, s)
+        s = self.fast[0](obj)
         if mask:  # alignment mask
             s = (s + mask) & ~mask
 #           if (mask + 1) & mask:
@@ -1109,6 +1391,7 @@ class _Typedef(object):
             self.type = type  # unchecked, as-is
             self.vari = v
             self.xtyp = xtyp
+            self.fast = self._compile()
             return
         e.update(extra)
         raise _OptionError(self.reset, **e)
@@ -1117,21 +1400,22 @@ class _Typedef(object):
         '''Save this typedef plus its class typedef.
         '''
         c, k = _key2tuple(t)
-        if k and k not in _typedefs:  # instance key
-            _typedefs[k] = self
-            if c and c not in _typedefs:  # class key
-                b = _basicsize(type(t), base=base, heap=heap)
-                k = _kind_ignored if _isignored(t) else self.kind
-                _typedefs[c] = _Typedef(base=b, both=False,
-                                        kind=k, type=t, refs=_type_refs)
-        elif t not in _typedefs:
-            if not _isbuiltin2(t):  # array, range, xrange in Python 2.x
-                s = ' '.join((self.vari, _moduleof(t), _nameof(t)))
-                s = '%r %s %s' % ((c, k), self.both, s.strip())
-                raise KeyError('typedef %r bad: %s' % (self, s))
-
-            _typedefs[t] = _Typedef(base=_basicsize(t, base=base), both=False,
-                                    kind=_kind_ignored, type=t)
+        with _typedefs_lock:
+            if k and k not in _typedefs:  # instance key
+                _typedefs[k] = self
+                if c and c not in _typedefs:  # class key
+                    b = _basicsize(type(t), base=base, heap=heap)
+                    k = _kind_ignored if _isignored(t) else self.kind
+                    _typedefs[c] = _Typedef(base=b, both=False,
+                                            kind=k, type=t, refs=_type_refs)
+            elif t not in _typedefs:
+                if not _isbuiltin2(t):  # array, range, xrange in Python 2.x
+                    s = ' '.join((self.vari, _moduleof(t), _nameof(t)))
+                    s = '%r %s %s' % ((c, k), self.both, s.strip())
+                    raise KeyError('typedef %r bad: %s' % (self, s))
+
+                _typedefs[t] = _Typedef(base=_basicsize(t, base=base), both=False,
+                                        kind=_kind_ignored, type=t)
 
     def set(self, safe_len=False, **kwds):
         '''Set one or more attributes.
@@ -1142,9 +1426,11 @@ class _Typedef(object):
             self.reset(**d)
         if safe_len and self.item:
             self.leng = _len
+            self.fast = self._compile()
 
 
 _typedefs = {}  # type: Dict[type, _Typedef]
+_typedefs_lock = threading.RLock()  # for writers only
 
 
 def _typedef_both(t, base=0, item=0, leng=None, refs=None,
@@ -1360,6 +1646,203 @@ except ImportError:  # no NumPy
         '''
         return False
 
+# sizing the buffers of exporters like bytearray, array.array,
+# memoryview, mmap and NumPy arrays once, see Asizer._buffer
+try:
+    import ctypes as _ctypes
+
+    class _Py_buffer(_ctypes.Structure):
+        '''C struct Py_buffer.
+        '''
+        _fields_ = [('buf', _ctypes.c_void_p),
+                    ('obj', _ctypes.c_void_p),
+                    ('len', _ctypes.c_ssize_t),
+                    ('itemsize', _ctypes.c_ssize_t),
+                    ('readonly', _ctypes.c_int),
+                    ('ndim', _ctypes.c_int),
+                    ('format', _ctypes.c_char_p),
+                    ('shape', _ctypes.POINTER(_ctypes.c_ssize_t)),
+                    ('strides', _ctypes.POINTER(_ctypes.c_ssize_t)),
+                    ('suboffsets', _ctypes.POINTER(_ctypes.c_ssize_t)),
+                    ('internal', _ctypes.c_void_p)]
+
+    # private prototypes, don't change those of ctypes.pythonapi
+    _PyObject_GetBuffer = _ctypes.PYFUNCTYPE(_ctypes.c_int, _ctypes.py_object,
+                                             _ctypes.POINTER(_Py_buffer),
+                                             _ctypes.c_int)(('PyObject_GetBuffer',
+                                                             _ctypes.pythonapi))
+    _PyBuffer_Release = _ctypes.PYFUNCTYPE(None, _ctypes.POINTER(_Py_buffer))(
+                                          ('PyBuffer_Release', _ctypes.pythonapi))
+    _PyBUF_STRIDES = 0x18
+
+    def _buffer_range(obj):
+        '''Return the address and the length in bytes of the
+           memory range spanned by the buffer of *obj*.
+        '''
+        b = _Py_buffer()
+        _PyObject_GetBuffer(obj, _ctypes.byref(b), _PyBUF_STRIDES)
+        try:
+            a, n = b.buf or 0, b.len
+            if n > 0 and b.ndim > 0:  # strided
+                lo = hi = 0
+                for i in range(b.ndim):
+                    z = (b.shape[i] - 1) * b.strides[i]
+                    if z < 0:
+                        lo += z
+                    else:
+                        hi += z
+                a, n = a + lo, hi - lo + b.itemsize
+        finally:
+            _PyBuffer_Release(_ctypes.byref(b))
+        return a, n
+
+except (AttributeError, ImportError, TypeError):  # no ctypes.pythonapi, e.g. PyPy
+    _buffer_range = None  # type: ignore
+
+# objects owned by the interpreter, skipped with option immortal=False,
+# immortal on CPython 3.12+, see PEP 683, checked only for these types
+_immortal_ids = set(map(id, (None, True, False, Ellipsis, NotImplemented,
+                             (), b'', '')))
+_immortal_types = {bool, bytes, int, str, tuple, type(None),
+                   type(Ellipsis), type(NotImplemented)}
+_is_interned = getattr(sys, '_is_interned', None)  # Python 3.13+
+try:
+    _is_immortal = sys._is_immortal  # Python 3.14+
+except AttributeError:
+    if sys.implementation.name == 'cpython' and sys.version_info >= (3, 12):
+        _immortal_refcnt = (1 << 30) - 1  # _Py_IMMORTAL_REFCNT, 32-bit
+
+        def _is_immortal(obj):  # PYCHOK redef
+            '''Is *obj* immortal, by its refcount?
+            '''
+            return sys.getrefcount(obj) >= _immortal_refcnt
+    else:
+        _is_immortal = None
+
+# sizing instances of classes with a managed __dict__ on CPython
+# 3.11 and 3.12 from the values, without materializing the __dict__,
+# reading the values at the offsets of those releases' release builds
+_Py_TPFLAGS_MANAGED_DICT = 1 << 4
+try:
+    if sys.implementation.name != 'cpython' or \
+       sys.version_info[:2] not in ((3, 11), (3, 12)) or \
+       hasattr(sys, 'gettotalrefcount'):  # debug build
+        raise ImportError
+    from ctypes import (c_ssize_t as _c_ssize_t, c_uint8 as _c_uint8,
+                        c_void_p as _c_void_p, py_object as _py_object)
+
+    class _Probe(object):
+        pass
+
+    # the shared keys of a class, ht_cached_keys, follow the
+    # ht_qualname of the heap type, found with a unique name
+    _Probe.__qualname__ = _Probe.__qualname__ + '_qualname'
+    _ht_cached_keys = [j for j, a in enumerate((_c_void_p * (type.__basicsize__ //
+                       _sizeof_Cvoidp)).from_address(id(_Probe)))
+                       if a == id(_Probe.__qualname__)]
+    if len(_ht_cached_keys) != 1:
+        raise ImportError
+    _ht_cached_keys = (_ht_cached_keys[0] + 1) * _sizeof_Cvoidp
+    del _Probe
+
+    def _values_cap(a):
+        '''Return the capacity and the prefix size of the values at
+           address *a*, exact unless the instance was created before
+           the shared keys of its class shrunk.
+        '''
+        n = _c_uint8.from_address(a - 2).value  # used
+        p = _c_uint8.from_address(a - 1).value  # prefix size
+        return min(max(n + 1, p - _sizeof_Cvoidp - 1), p - 2), p
+
+    if sys.version_info[:2] == (3, 11):  # dict and values pointers
+
+        def _values_addr(obj):
+            '''Return the address of the values of the managed __dict__
+               of *obj* or 0 if the values are in a dict.
+            '''
+            a = id(obj) - _sizeof_Cvoidp * 3
+            if _c_void_p.from_address(a).value:  # dict
+                return 0
+            return _c_void_p.from_address(a - _sizeof_Cvoidp).value or 0
+
+    else:  # dict or tagged values pointer
+
+        def _values_addr(obj):  # PYCHOK redef
+            '''Return the address of the values of the managed __dict__
+               of *obj* or 0 if the values are in a dict.
+            '''
+            a = _c_void_p.from_address(id(obj) - _sizeof_Cvoidp * 3).value
+            return (a + 1) if a and (a & 1) else 0
+
+    def _managed_items(obj, refs=None):
+        '''Return a list of 2-tuples (key, value) for the values of
+           the managed __dict__ of *obj*, keyed by the shared keys of
+           its class, or None if the values are in a dict.
+        '''
+        a = _values_addr(obj)
+        if not a:
+            return None
+        rs = []
+        k = _c_void_p.from_address(id(type(obj)) + _ht_cached_keys).value
+        if k and _c_uint8.from_address(k + _sizeof_Cvoidp + 2).value == 2:  # split
+            # the values come from the referents, only the
+            # keys are read from the shared keys entries
+            ids = dict((id(o), o) for o in (refs or _getreferents(obj)))
+            n = _c_ssize_t.from_address(k + _sizeof_Cvoidp * 3).value  # entries
+            e = _c_uint8.from_address(k + _sizeof_Cvoidp + 1).value  # index bytes
+            e = k + _sizeof_Cvoidp * 4 + (1 << e)  # first entry
+            for j in range(min(n, _values_cap(a)[0])):
+                v = _c_void_p.from_address(a + _sizeof_Cvoidp * j).value
+                if v in ids:  # me_key, me_value
+                    m = e + _sizeof_Cvoidp * 2 * j
+                    if _c_void_p.from_address(m).value:
+                        rs.append((_py_object.from_address(m).value, ids[v]))
+        return rs
+
+    def _managed_values(obj):
+        '''Return the size of the values of the managed __dict__
+           of *obj* or 0 if the values are in a dict.
+        '''
+        a = _values_addr(obj)
+        if a:
+            c, p = _values_cap(a)
+            return p + c * _sizeof_Cvoidp
+        return 0
+
+except (AttributeError, ImportError, TypeError):  # no managed __dict__
+    _managed_items = _managed_values = _values_addr = None  # type: ignore
+
+
+def _ismanaged(t):
+    '''Is *t* a class with a managed __dict__ sizable without
+       materializing the __dict__?
+    '''
+    return bool(_managed_values and (getattr(t, '__flags__', 0) &
+                                     _Py_TPFLAGS_MANAGED_DICT))
+
+
+def _dictof(obj):
+    '''Return the __dict__ of *obj* or None, without materializing
+       a managed __dict__.
+    '''
+    if _ismanaged(type(obj)) and (_values_addr(obj) or
+                                  dict not in map(type, _getreferents(obj))):
+        return None  # values not in a dict or no __dict__
+    return getattr(obj, '__dict__', None)
+
+# bytes of the buffer included in the flat size by type, None
+# for views like memoryview and mmap not including the buffer
+_buffer_types = {bytearray: _len_bytearray,
+                 _array: _len_array,
+                 memoryview: None}  # type: Dict[type, Union[None, Callable]]
+try:
+    from mmap import mmap as _mmap
+    _buffer_types[_mmap] = None
+except ImportError:  # no mmap
+    pass
+
+_typedef_both(memoryview, refs=_memoryview_refs)
+
 try:
     _typedef_both(range)
 except NameError:  # missing
@@ -1434,10 +1917,13 @@ try:
 except NameError:
     pass
 
-try:  # generator (expression), no itemsize, no len(), not callable()
-    _typedef_both(Types.GeneratorType, refs=_gen_refs)
-except AttributeError:  # missing
-    pass
+# generator (expression), coroutine and asynchronous
+# generator, no itemsize, no len(), not callable()
+for t in ('GeneratorType', 'CoroutineType', 'AsyncGeneratorType'):
+    try:
+        _typedef_both(getattr(Types, t), refs=_gen_refs)
+    except AttributeError:  # missing
+        pass
 
 try:  # <type 'weakcallableproxy'>
     _typedef_code(Weakref.CallableProxyType, refs=_weak_refs)
@@ -1473,7 +1959,91 @@ for t in s:
 del i, s, t
 
 
-def _typedef(obj, derive=False, frames=False, infer=False):  # MCCABE 25
+# typedefs of third-party types registered by entry points,
+# see functions aregister, _plugin and _typedef
+_plugin_group = 'pympler.typedefs'
+_plugins = None  # type: Union[None, Dict[str, object]]
+_stdlib_modules = frozenset(getattr(sys, 'stdlib_module_names', ())).union(
+                            sys.builtin_module_names, ('__main__', 'builtins'))
+
+
+def _plugin(t, v):
+    '''Set typedef *v* for type *t* from the entry point
+       named after *t* or one of its base classes and
+       return True, otherwise False.  The entry points
+       are loaded for the first third-party class only.
+    '''
+    global _plugins
+    if _plugins is None:  # load entry point names once, on demand
+        if not any(_moduleof(c).split('.')[0] not in _stdlib_modules
+                   for c in getattr(t, '__mro__', (t,))):
+            return False  # no third-party class
+        _plugins = _plugins_load()
+    if _plugins:
+        for c in getattr(t, '__mro__', (t,)):
+            e = _plugins.get('%s.%s' % (_moduleof(c), getattr(c, '__qualname__', _nameof(c))), None)
+            if e is not None:
+                try:
+                    d = e.load()(t)
+                    if d:
+                        v.reset(**_plugin_kwds(t, **d))
+                        return True
+                except Exception as x:
+                    warnings.warn('typedef plugin %r for %r failed: %r' % (e, t, x))
+                break
+    return False
+
+
+def _plugin_kwds(t, flat=None, leng=None, refs=None, base=0, item=0):
+    '''Return the typedef keyword arguments, see **aregister**.
+    '''
+    if flat:
+        if leng or base or item:
+            raise _OptionError(aregister, flat=flat, leng=leng, base=base, item=item)
+        d = dict(base=0, item=1, leng=flat)
+    elif leng:
+        d = dict(base=_basicsize(t, base=base), item=_itemsize(t, item), leng=leng)
+    else:
+        d = dict(base=_basicsize(t, base=base))
+    n = d.get('leng', None)
+    if n:
+        if not callable(n):
+            raise _OptionError(aregister, flat=flat, leng=leng)
+        _all_lens.add(n)
+    if refs:
+        if not callable(refs):
+            raise _OptionError(aregister, refs=refs)
+
+        def r(obj, unused):  # unnamed
+            return refs(obj)
+
+        r.__name__ = _nameof(refs, 'refs')
+        _all_refs.add(r)
+        d.update(refs=r)
+    d.update(both=True, kind=_kind_static, type=t, xtyp=True)
+    return d
+
+
+def _plugins_load():
+    '''Return a dict of the entry points in group *_plugin_group*
+       by name, loading none of those.
+    '''
+    try:
+        from importlib.metadata import entry_points
+        es = entry_points()
+        if hasattr(es, 'select'):  # Python 3.10+
+            es = es.select(group=_plugin_group)
+        else:
+            es = es.get(_plugin_group, ())
+        return dict((e.name, e) for e in es)
+    except ImportError:  # Python 3.7-
+        pass
+    except Exception as x:
+        warnings.warn('typedef plugins %r failed: %r' % (_plugin_group, x))
+    return {}
+
+
+def _typedef(obj, derive=False, frames=False, infer=False):  # MCCABE 26
     '''Create a new typedef for an object.
     '''
     t =  type(obj)
@@ -1497,6 +2067,8 @@ def _typedef(obj, derive=False, frames=False, infer=False):  # MCCABE 25
               leng=_len_code,
               refs=_co_refs,
               both=False)  # code only
+    elif _plugin(t, v):  # third-party type
+        pass
     elif callable(obj):
         if isclass(obj):  # class or type
             v.set(refs=_class_refs,
@@ -1528,6 +2100,8 @@ def _typedef(obj, derive=False, frames=False, infer=False):  # MCCABE 25
         v.set(refs=_namedtuple_refs)
     elif _numpy and _isnumpy(obj):
         v.set(**_numpy_kwds(obj))
+        if isinstance(obj, _numpy.ndarray):
+            _buffer_types[t] = v.leng
     elif isinstance(obj, _array):
         v.set(**_array_kwds(obj))
     elif _isignored(obj):
@@ -1538,28 +2112,93 @@ def _typedef(obj, derive=False, frames=False, infer=False):  # MCCABE 25
             if p:  # duplicate parent
                 v.dup(other=p, kind=_kind_derived)
                 return v
-        if _issubclass(t, Exception):
+        if _isfuture(t):  # asyncio.Future, .Task
+            v.set(item=_itemsize(t), safe_len=True,
+                  refs=_future_refs)
+        elif _issubclass(t, Exception):
             v.set(item=_itemsize(t), safe_len=True,
                   refs=_exc_refs,
                   kind=_kind_derived)
         elif isinstance(obj, Exception):
             v.set(item=_itemsize(t), safe_len=True,
                   refs=_exc_refs)
+        elif _ismanaged(t):
+            v.set(item=_itemsize(t), safe_len=True,
+                  refs=_managed_refs)
         else:
             v.set(item=_itemsize(t), safe_len=True,
                   refs=_inst_refs)
     return v
 
 
+def _bins(h):
+    '''Return the non-empty bins of log2 histogram *h* as
+       a list of 3-tuples (low, high, count).
+    '''
+    return [(1 << b >> 1, (1 << b) - 1, c) for b, c in enumerate(h) if c]
+
+
+class _Path(object):
+    '''Internal **Asized**-like node, keeping only the heaviest
+       paths to the objects below it, see **Asizer.apaths**.
+    '''
+    __slots__ = ('error', 'flat', 'name', 'paths', 'size')
+
+    def __init__(self, size, flat, name):
+        self.error = 0
+        self.flat = flat
+        self.name = name  # lazy name
+        self.paths = []  # [(size, path), ...]
+        self.size = size
+
+
+class _Paths(object):
+    '''Internal factory of **_Path** nodes, called like class
+       **Asized** by **Asizer._sizer**.
+
+       A path ends at an object, a *culprit*, with no referent
+       attributed more than half its size and is kept as linked
+       tuples of edges ((name, size, flat), path) from the node.
+    '''
+    def __init__(self, n):
+        self.n = n
+        self.nodes = []  # keep ids unique, see Asizer._sizer
+
+    def __call__(self, size, flat, refs=(), name=None, error=0):
+        s = _Path(size, flat, name)
+        s.error = error
+        ps, m = s.paths, 0
+        for r in refs:
+            e = r.name, r.size, r.flat
+            ps.extend((z, (e, p)) for z, p in r.paths)
+            if m < r.size:
+                m = r.size
+            r.name = r.paths = None
+        if size and (m * 2) <= size:  # culprit
+            ps.append((size, None))
+        if len(ps) > self.n:
+            s.paths = nlargest(self.n, ps, key=itemgetter(0))
+        self.nodes.append(s)
+        return s
+
+
 class _Prof(object):
     '''Internal type profile class.
     '''
+    deeps  = ()     # deep size histogram, log2 bins
+    flats  = ()     # flat size histogram, log2 bins
     high   = 0      # largest size
+    lengs  = ()     # length histogram, log2 bins
     number = 0      # number of (unique) objects
     objref = None   # largest obj (weakref)
     total  = 0      # total size
     weak   = False  # objref is weakref(obj)
 
+    def __init__(self):
+        self.deeps = [0] * 65  # index int.bit_length()
+        self.flats = [0] * 65
+        self.lengs = [0] * 65
+
     def __cmp__(self, other):
         if self.total < other.total:
             return -1
@@ -1591,11 +2230,27 @@ class _Prof(object):
                     lengstr=_lengstr(o), obj=_repr(o, clip=clip),
                     plural=p, total=t)
 
+    def histograms(self):
+        '''Return the non-empty histogram bins as dict.
+        '''
+        return dict(deep=_bins(self.deeps), flat=_bins(self.flats),
+                    leng=_bins(self.lengs))
+
+    def leng(self, obj):
+        '''Update the length histogram.
+        '''
+        try:
+            n = len(obj)
+        except Exception:  # TypeError, etc.
+            return
+        self.lengs[n.bit_length()] += 1
+
     def update(self, obj, size):
         '''Update this profile.
         '''
         self.number += 1
         self.total += size
+        self.flats[size.bit_length()] += 1
         if self.high < size:  # largest
             self.high = size
             try:  # prefer using weak ref
@@ -1639,10 +2294,229 @@ class _Rank(object):
                _repr(o, clip=clip), _lengstr(o), _ix(self.id), d, p)
 
 
+# sizing the items of large containers in bulk, see Asizer._leafs
+_bulk_min = 64  # minimal number of items
+_bulk_types = {dict, frozenset, list, set, tuple}  # only exact types
+
+
+class _Tree(object):
+    '''Internal storage of an **AsizedTree**, the nodes of an
+       **Asized** tree in post-order in parallel arrays, added by
+       **Asizer._sizer** calling this like class **Asized**.
+    '''
+    __slots__ = ('_ix', 'counts', 'errors', 'flats', 'names', 'sizes', 'strs')
+
+    def __init__(self):
+        self._ix     = {}  # {name: index into strs} while adding
+        self.counts  = _array('q')  # number of nodes in the subtree
+        self.errors  = {}  # {node: error} of AsizedEstimates
+        self.flats   = _array('q')
+        self.names   = _array('q')  # index into strs or -1
+        self.sizes   = _array('q')
+        self.strs    = []  # interned names or lazy names
+
+    def __call__(self, size, flat, refs=(), name=None, error=0):
+        '''Add a node after the nodes of its *refs*, the indices
+           of the preceding subtrees, and return its index.
+        '''
+        i, cs = len(self.sizes), self.counts
+        cs.append(sum(cs[j] for j in refs) + 1)
+        self.flats.append(flat)
+        self.sizes.append(size)
+        if name is None:
+            j = -1
+        elif type(name) is str:
+            j = self._ix.get(name, None)  # intern
+            if j is None:
+                self._ix[name] = j = len(self.strs)
+                self.strs.append(name)
+        else:  # lazy names
+            j = len(self.strs)
+            self.strs.append(name)
+        self.names.append(j)
+        if error:
+            self.errors[i] = error
+        return i
+
+    def __getstate__(self):
+        '''Return the state, with all names formatted.
+        '''
+        return None, dict(counts=self.counts, errors=self.errors, flats=self.flats,
+                          names=self.names, sizes=self.sizes,
+                          strs=[self.name(j) for j in range(len(self.strs))])
+
+    def kids(self, i):
+        '''Return a list of the child nodes of node *i*.
+        '''
+        cs, ks = self.counts, []
+        j, e = i - 1, i - self.counts[i]
+        while j > e:  # last child first
+            ks.append(j)
+            j -= cs[j]
+        ks.reverse()
+        return ks
+
+    def name(self, j):
+        '''Return name *j*, formatted.
+        '''
+        n = self.strs[j]
+        if type(n) is tuple:  # lazy
+            self.strs[j] = n = _lazyname(n)
+        return n
+
+
+class _Visit(object):
+    '''Internal state of an object being sized, kept on
+       the **Asizer** stack while its referents are sized.
+    '''
+    __slots__ = ('deep', 'flat', 'id', 'itor', 'key', 'name',
+                 'obj', 'pid', 'refs', 'size', 'var')
+    items = None  # see _Sample
+
+    def __init__(self, key, obj, flat, deep, pid, itor, refs, name=None):
+        self.deep = deep   # recursion depth
+        self.flat = flat   # flat size
+        self.id   = id(obj)
+        self.itor = itor   # iterator over the referents
+        self.key  = key    # Typedef key
+        self.name = name   # name or None
+        self.obj  = obj
+        self.pid  = pid    # id(parent obj)
+        self.refs = refs   # list of Asized referents or None
+        self.size = flat   # total size so far
+        self.var  = 0      # variance of the size estimate
+
+
+class _Sample(_Visit):
+    '''Internal state of a container being sized from a
+       random sample of its items, see option *sample*.
+    '''
+    __slots__ = ('items', 'n')
+
+    def __init__(self, key, obj, flat, deep, pid, itor, n, name=None):
+        _Visit.__init__(self, key, obj, flat, deep, pid, itor, None, name)
+        self.items = []  # size of each sampled item
+        self.n = n  # total number of items
+
+    def estimate(self):
+        '''Extrapolate the size and its variance from the
+           sizes of the sampled items.
+        '''
+        ss, n = self.items, self.n
+        m = len(ss)
+        if 0 < m < n:
+            a = sum(ss) / m  # mean item size
+            v = (sum((s - a)**2 for s in ss) / (m - 1)) if m > 1 else 0
+            r = n / m
+            self.size = self.flat + int(a * n + 0.5)
+            self.var = self.var * r * r + n * n * v / m * (1 - m / n)
+
+
+def _sample(obj, m):
+    '''Return a list of *m* randomly sampled items of a list,
+       tuple, set, frozenset or dict and the number of items.
+       For dicts, both the keys and the values are items.
+    '''
+    n = len(obj)
+    ix = _random_sample(range(n), m)
+    if isinstance(obj, (list, tuple)):
+        return list(map(obj.__getitem__, ix)), n
+    d = isinstance(obj, dict)
+    t, i = iter(obj.items() if d else obj), 0
+    ss = []
+    for j in sorted(ix):  # skip to the next sampled item
+        ss.append(next(islice(t, j - i, None)))
+        i = j + 1
+    if d:
+        return list(chain.from_iterable(ss)), n * 2
+    return ss, n
+
+
+def _samples(sample, n):
+    '''Return the number of items to sample from *n* items.
+    '''
+    if isinstance(sample, float):
+        return max(_sample_min, int(n * sample))
+    return sample
+
+
+def _error(var):
+    '''Return the 95% error bound for variance *var*.
+    '''
+    return int(_z95 * sqrt(var) + 0.5)
+
+
+_sample_min = 100  # minimal number of items for sample fractions
+_z95 = 1.96  # 95% confidence interval
+
+
+# compacting the visited ids, see _Seen
+_seen_max = 1 << 20  # maximal number of ids in the dict
+_seen_page = 20  # log2 of the address range per bitmap page
+_seen_mask = (1 << _seen_page) - 1
+
+
 class _Seen(dict):
     '''Internal obj visits counter.
+
+       Once the dict holds more than *_seen_max* ids, the
+       ids visited only once are moved into a bitmap, one
+       bit per 8-byte address in pages of 1 MB.  The dict
+       keeps only the other visit counts and excluded ids.
     '''
+    __slots__ = ('base', 'max', 'ones', 'pages', 'peak')
+
+    def __init__(self, base=None):
+        dict.__init__(self)
+        self.base = base  # Abaseline or None
+        self.max = _seen_max
+        self.ones = 0  # number of ids in the bitmap
+        self.pages = {}  # {id >> _seen_page: bytearray}
+        self.peak = 0  # overhead
+
+    def flush(self):
+        '''Move the ids visited once into the bitmap.
+        '''
+        self.overhead()  # peak
+        d, n, ps, m = {}, 0, self.pages, _seen_mask
+        for i, s in _items(self):
+            if s == 1 and not i & 7:
+                p = ps.get(i >> _seen_page, None)
+                if p is None:
+                    ps[i >> _seen_page] = p = bytearray((m + 1) >> 6)
+                p[(i & m) >> 6] |= 1 << ((i >> 3) & 7)
+                n += 1
+            else:
+                d[i] = s
+        self.clear()  # release the table
+        self.update(d)
+        self.ones += n
+        self.max = max(self.max, len(d) * 2)
+
+    def _news(self, m, c=None):
+        '''Count a visit for each id in dict *m*, *c*
+           times each, and remove the ids seen before.
+        '''
+        if self.ones:  # move ids back into the dict
+            list(filter(self.had, m))
+        if self.base:  # exclude baseline ids
+            list(filter(self.based, m))
+        for i in list(filter(self.__contains__, m)):
+            s = self[i]  # seen before
+            if s > 0:
+                self[i] = s + (c[i] if c else 1)
+            del m[i]
+        if c:
+            self.update(zip(m, map(c.__getitem__, m)))
+        else:
+            self.update(zip(m, repeat(1)))
+        if len(self) > self.max:
+            self.flush()
+        return m
+
     def again(self, key):
+        if self.ones and key not in self:
+            self.had(key)
         try:
             s = self[key] + 1
         except KeyError:
@@ -1650,9 +2524,360 @@ class _Seen(dict):
         if s > 0:
             self[key] = s
 
+    def based(self, i):
+        '''Return True if id *i* is in the baseline and
+           exclude it, otherwise False.
+        '''
+        if i in self.base:
+            self[i] = -1
+            return True
+        return False
+
+    def counts(self):
+        '''Return the number of ids seen, sized and duplicate.
+        '''
+        n, s, d = self.ones, self.ones, 0
+        for v in _values(self):
+            if v > 0:
+                n += v
+                s += 1
+                if v > 1:
+                    d += 1
+        return n, s, d
+
+    def news(self, objs):
+        '''Count a visit for each of the *objs*, all referents
+           (not given objects) and return a list of the *objs*
+           not seen before, each once.
+        '''
+        ids = list(map(id, objs))
+        m = dict(zip(ids, objs))
+        c = Counter(ids) if len(m) < len(ids) else None
+        return list(self._news(m, c).values())
+
+    def newsizes(self, ids, sizes):
+        '''Count a visit for each of the unique *ids*, all
+           referents and return the number and the total of
+           the *sizes* of the ids not seen before.
+        '''
+        m = self._news(dict(zip(ids, sizes)))
+        return len(m), sum(m.values())
+
+    def had(self, i):
+        '''Return True if id *i* was in the bitmap and
+           move it back into the dict, otherwise False.
+        '''
+        p = self.pages.get(i >> _seen_page, None)
+        if p is not None:
+            j, b = (i & _seen_mask) >> 6, 1 << ((i >> 3) & 7)
+            if p[j] & b:
+                p[j] &= ~b
+                self.ones -= 1
+                self[i] = 1
+                return True
+        return False
+
+    def overhead(self):
+        '''Return the peak size of this counter in bytes.
+        '''
+        ps = self.pages
+        n = _getsizeof(self) + _getsizeof(ps) + len(self) * _getsizeof(id(ps))
+        if ps:
+            n += len(ps) * _getsizeof(next(iter(_values(ps))))
+        self.peak = max(self.peak, n)
+        return self.peak
+
+    def setdefault(self, key, default=None):
+        if self.ones and key not in self:
+            self.had(key)
+        return dict.setdefault(self, key, default)
+
+
+class _Buffers(object):
+    '''Internal record of the buffer address ranges charged,
+       as sorted lists of disjoint, merged ranges.
+    '''
+    __slots__ = ('his', 'los', 'shared', 'views')
+
+    def __init__(self):
+        self.his = []  # range ends
+        self.los = []  # range starts
+        self.shared = 0  # bytes not charged again
+        self.views = []  # ranges of views, not charged
+
+    def _covered(self, lo, hi):
+        '''Return the range indices and the number of bytes
+           already charged within address range [*lo*, *hi*).
+        '''
+        los, his = self.los, self.his
+        i = bisect_left(his, lo)  # first range ending at or after lo
+        j = bisect_right(los, hi)  # first range starting after hi
+        c = sum(max(0, min(his[k], hi) - max(los[k], lo)) for k in range(i, j))
+        return i, j, c
+
+    def charge(self, a, n):
+        '''Charge *n* bytes at address *a* and return the
+           number of those bytes not charged before.
+        '''
+        b = a + n
+        i, j, c = self._covered(a, b)
+        if i < j:  # merge
+            a = min(a, self.los[i])
+            b = max(b, self.his[j - 1])
+        self.los[i:j] = [a]
+        self.his[i:j] = [b]
+        self.shared += c
+        return n - c
+
+    def sharing(self):
+        '''Return the number of bytes shared.
+        '''
+        return self.shared + sum(self._covered(a, a + n)[2] for a, n in self.views)
+
+
+def _guard(obj):
+    '''Return the type and the ids of the referents of an immutable,
+       not weakref-able *obj*, identifying its sizes without keeping
+       *obj* alive.  An other object at the same address with the same
+       guard refers to the same, live, immutable referents.
+    '''
+    return type(obj), tuple(map(id, _getreferents(obj)))
+
+
+class _Cache(object):
+    '''Internal cache of the sizes of the referents of
+       immutable objects, kept across **Asizer** calls.
+
+       The cache holds no references to the objects cached.
+    '''
+    def __init__(self, maxobjs=1 << 20):
+        self._d = {}  # id(obj): (ref or guard, opts, entry), least recently used first
+        self._lock = threading.Lock()
+        self._objs = 0  # number of referents cached
+        self.maxobjs = maxobjs
+
+    def _evict(self):  # with self._lock
+        '''Remove the least recently used entries.
+        '''
+        d = self._d
+        while self._objs > self.maxobjs or len(d) > self.maxobjs:
+            e = d.pop(next(iter(d)))
+            if e[2]:
+                self._objs -= len(e[2][0])
+
+    def _pop(self, i, ref):
+        '''Remove the entry for *i* if still for *ref*.
+        '''
+        with self._lock:
+            e = self._d.get(i, None)
+            if e and e[0] is ref:
+                del self._d[i]
+                if e[2]:
+                    self._objs -= len(e[2][0])
+
+    def clear(self):
+        '''Remove all entries.
+        '''
+        with self._lock:
+            self._d.clear()
+            self._objs = 0
+
+    def get(self, obj, opts):
+        '''Return the entry for *obj* and sizing *opts*, a 3-tuple
+           (ids, sizes, height) or () if *obj* is not immutable
+           all the way down or None if *obj* is not cached.
+        '''
+        i = id(obj)
+        e = self._d.get(i, None)
+        if e:
+            r, o, e = e
+            if o == opts and (r() is obj if isinstance(r, Weakref.ref)
+                              else r == _guard(obj)):
+                with self._lock:  # most recently used
+                    t = self._d.pop(i, None)
+                    if t:
+                        self._d[i] = t
+                return e
+        return None
+
+    def put(self, obj, opts, entry):
+        '''Add or replace the *entry* for *obj* and sizing *opts*
+           and evict the least recently used entries if needed.
+        '''
+        i = id(obj)
+        try:  # validate by identity
+            r = Weakref.ref(obj, lambda r: self._pop(i, r))
+        except TypeError:  # validate by referents
+            r = _guard(obj)
+        n = len(entry[0]) if entry else 0
+        if n <= self.maxobjs:
+            with self._lock:
+                d = self._d
+                e = d.pop(i, None)
+                if e and e[2]:
+                    self._objs -= len(e[2][0])
+                d[i] = r, opts, entry
+                self._objs += n
+                self._evict()
+
+    def resize(self, maxobjs):
+        '''Set the maximum number of referents and entries.
+        '''
+        with self._lock:
+            self.maxobjs = maxobjs
+            self._evict()
+
+
+_cache = _Cache()  # see option *cache*
+
+
+def _after_fork():
+    '''Renew the module locks in a forked child, any
+       of those may have been held by another thread.
+    '''
+    global _typedefs_lock
+    _typedefs_lock = threading.RLock()
+    _cache._lock = threading.Lock()
+
+
+try:
+    from os import register_at_fork
+    register_at_fork(after_in_child=_after_fork)
+except ImportError:  # Windows
+    pass
+_cache_min = 64  # minimal len of cached tuples and frozensets
+_cache_types = {bool, bytes, complex, float, frozenset, int, range, str,
+                tuple, type(None), type(Ellipsis)}  # immutable, exact types
+
+
+def _iscached(typ, obj):
+    '''Return True for immutable objects with sizes worth caching.
+    '''
+    if typ is tuple or typ is frozenset:
+        return len(obj) >= _cache_min
+    return _isfrozen(typ)
+
 
 # Public classes
 
+class Abaseline(object):
+    '''The ids of all objects reachable from the roots given to
+       function **abaseline**, by default all modules, treated as
+       seen before by option *baseline*.
+
+       The ids are kept in a bitmap, one bit per 8-byte address.  The
+       ids of objects released since are not removed and any object
+       created later at the same address is treated as seen before,
+       use method **refresh** to rebuild the baseline.
+
+       An **Abaseline** instance holds references to the given roots
+       only.  It can be shared by several **Asizer** instances, but
+       not while being updated or refreshed.
+    '''
+    __slots__ = ('_ids', '_mods', '_n', '_opts', '_pages', '_roots')
+
+    def __init__(self, roots, opts):
+        self._ids = set()  # unaligned ids
+        self._mods = None if roots else set()  # ids of modules walked
+        self._n = 0  # number of ids
+        self._opts = opts  # sizing options
+        self._pages = {}  # {id >> _seen_page: bytearray}
+        self._roots = list(roots)
+        self.refresh()
+
+    def __contains__(self, i):  # id
+        if i & 7:
+            return i in self._ids
+        p = self._pages.get(i >> _seen_page, None)
+        return bool(p and p[(i & _seen_mask) >> 6] & (1 << ((i >> 3) & 7)))
+
+    def __len__(self):
+        return self._n
+
+    def __str__(self):
+        return 'objects %d, overhead %d' % (len(self), self.overhead)
+
+    def _add(self, seen):
+        '''Add the ids *seen* and return the number added.
+        '''
+        n, ps, m = 0, self._pages, _seen_mask
+        for k, p in _items(seen.pages):
+            b = ps.get(k, None)
+            if b is None:
+                ps[k] = b = bytearray(len(p))
+            o = int.from_bytes(b, 'little')
+            u = o | int.from_bytes(p, 'little')
+            n += bin(u).count('1') - bin(o).count('1')
+            b[:] = u.to_bytes(len(b), 'little')
+        for i, s in _items(seen):
+            if s > 0 and i not in self:
+                if i & 7:
+                    self._ids.add(i)
+                else:
+                    p = ps.get(i >> _seen_page, None)
+                    if p is None:
+                        ps[i >> _seen_page] = p = bytearray((m + 1) >> 6)
+                    p[(i & m) >> 6] |= 1 << ((i >> 3) & 7)
+                n += 1
+        self._n += n
+        return n
+
+    def _modules(self):
+        '''Return the modules not walked before.
+        '''
+        ms, ws = [], self._mods
+        for m in list(sys.modules.values()):
+            if ismodule(m) and id(m) not in ws:
+                ws.add(id(m))
+                ms.append(m)
+        return ms
+
+    def _walk(self, objs, base):
+        '''Add the ids of all objects reachable from
+           *objs* and return the number added.
+        '''
+        a = _asizers.get()
+        try:
+            a.reset(baseline=base, **self._opts)
+            a.exclude_objs(self, self._ids, self._mods, self._pages,
+                                 self._roots, *_values(self._pages))
+            a.asizesof(*objs)
+            return self._add(a._seen)
+        finally:
+            _asizers.put(a)
+
+    @property
+    def overhead(self):
+        '''Get the size of the bitmap and ids in bytes (int).
+        '''
+        ps = self._pages
+        return sum(map(_getsizeof, _values(ps)), _getsizeof(ps) +
+                                                  _getsizeof(self._ids))
+
+    def refresh(self):
+        '''Rebuild this baseline from all roots, including any
+           modules imported since, and return the number of objects.
+        '''
+        self._ids, self._n, self._pages = set(), 0, {}
+        rs = list(self._roots)
+        if self._mods is not None:
+            self._mods = set()
+            rs.extend(self._modules())
+        return self._walk(rs, None)
+
+    def update(self, *objs):
+        '''Add all objects reachable from the given *objs* as roots
+           and, by default, from any modules imported since, without
+           walking the objects in this baseline again.  Return the
+           number of objects added.
+        '''
+        rs = list(objs)
+        self._roots.extend(rs)
+        if self._mods is not None:
+            rs.extend(self._modules())
+        return self._walk(rs, self) if rs else 0
+
+
 class Asized(object):
     '''Stores the results of an **asized** object in the following
        4 attributes:
@@ -1664,15 +2889,25 @@ class Asized(object):
         *name* -- name or ``repr`` of the object
 
         *refs* -- tuple containing an **Asized** instance for each referent
+
+       The *name* of atomic objects, like ``str`` and ``int``, of dict
+       keys and values and of objects with the default ``repr`` is
+       formatted only when used, the first time.
     '''
-    __slots__ = ('flat', 'name', 'refs', 'size')
+    __slots__ = ('_name', 'flat', 'refs', 'size')
+    _state    = ('flat', 'name', 'refs', 'size')  # see __getstate__
 
     def __init__(self, size, flat, refs=(), name=None):
         self.size = size  # total size
         self.flat = flat  # flat size
-        self.name = name  # name, repr or None
+        self._name = name  # name, repr, lazy name or None
         self.refs = tuple(refs)
 
+    def __getstate__(self):
+        '''Return the state, with the name formatted, for pickle and copy.
+        '''
+        return None, dict((a, getattr(self, a)) for a in self._state)
+
     def __str__(self):
         return 'size %r, flat %r, refs[%d], name %r' % (
             self.size, self.flat, len(self.refs), self.name)
@@ -1711,35 +2946,240 @@ class Asized(object):
                 return ref
         return dflt
 
+    @property
+    def name(self):
+        '''Get the name or ``repr`` of the object (str or None).
+        '''
+        n = self._name
+        if type(n) is tuple:  # lazy
+            self._name = n = _lazyname(n)
+        return n
+
+    @name.setter
+    def name(self, name):
+        '''Set the name.
+        '''
+        self._name = name
+
 
-class Asizer(object):
-    '''Sizer state and options to accumulate sizes.
+class AsizedEstimate(Asized):
+    '''An **Asized** instance with an additional attribute:
+
+        *error* -- error bound of the *size* (in bytes), estimated from
+                   random samples of the items of large containers, see
+                   option *sample*.  The actual size is within *size* +/-
+                   *error* with a confidence of about 95%.
     '''
-    _above_  = 1024   # rank only objs of size 1K+
-    _align_  = 8  # alignment, power-of-2
-    _clip_   = 80
-    _code_   = False
-    _cutoff_ = 0  # in percent
-    _derive_ = False
-    _detail_ = 0  # for Asized only
+    __slots__ = ('error',)
+    _state    = Asized._state + __slots__
+
+    def __init__(self, size, flat, refs=(), name=None, error=0):
+        Asized.__init__(self, size, flat, refs=refs, name=name)
+        self.error = error  # 95% error bound
+
+    def __str__(self):
+        return '%s, error %r' % (Asized.__str__(self), self.error)
+
+
+class AsizedTree(object):
+    '''An **Asized**-like node of a compact tree, returned by **asized**
+       with option *compact=True*.  The *size*, *flat*, *name* and *refs*
+       of all nodes are kept in parallel arrays and an interned name
+       table, shared by all nodes of the tree.  Nodes are read-only,
+       use method **asized** or ``copy.deepcopy`` to get a mutable
+       **Asized** tree.
+    '''
+    __slots__ = ('_i', '_t')
+
+    def __init__(self, tree, i):
+        self._i = i  # node index
+        self._t = tree  # _Tree
+
+    def __deepcopy__(self, memo):
+        return self.asized()
+
+    __str__ = Asized.__str__
+    format  = Asized.format
+    get     = Asized.get
+
+    def asized(self):
+        '''Return this node and its referents as **Asized** tree.
+        '''
+        t = self._t
+
+        def _asized(i):
+            rs = [_asized(j) for j in t.kids(i)]
+            j = t.names[i]
+            n = t.strs[j] if j >= 0 else None
+            if t.errors:
+                return AsizedEstimate(t.sizes[i], t.flats[i], refs=rs, name=n,
+                                      error=t.errors.get(i, 0))
+            return Asized(t.sizes[i], t.flats[i], refs=rs, name=n)
+
+        return _asized(self._i)
+
+    @property
+    def error(self):
+        '''Get the error bound of the *size* (in bytes), see **AsizedEstimate**.
+        '''
+        return self._t.errors.get(self._i, 0)
+
+    @property
+    def flat(self):
+        '''Get the flat size of the object (in bytes).
+        '''
+        return self._t.flats[self._i]
+
+    @property
+    def name(self):
+        '''Get the name or ``repr`` of the object (str or None).
+        '''
+        j = self._t.names[self._i]
+        return self._t.name(j) if j >= 0 else None
+
+    @property
+    def refs(self):
+        '''Get a tuple with an **AsizedTree** node for each referent.
+        '''
+        t = self._t
+        return tuple(AsizedTree(t, j) for j in t.kids(self._i))
+
+    @property
+    def size(self):
+        '''Get the total size of the object (including referents).
+        '''
+        return self._t.sizes[self._i]
+
+
+class Aretained(object):
+    '''The dominator tree and retained sizes of all objects reachable
+       from the objects given to function **aretained**.
+
+       An object dominates another if every path from the given objects
+       to the other object passes through that object.  The retained
+       size of an object is the total flat size of all objects it
+       dominates, including itself, i.e. the size freed if the object
+       were released.  Objects shared between given objects are only
+       retained by all given objects jointly.
+
+       An **Aretained** instance holds references to all reachable
+       objects.
+    '''
+    __slots__ = ('_flats', '_idom', '_ix', '_keys', '_objs', '_rets', '_types')
+
+    def __init__(self, ix, objs, keys, flats, idom, rets, types):
+        self._flats = flats  # flat size per node
+        self._idom = idom  # immediate dominator node per node
+        self._ix = ix  # {id(obj): node or -1}
+        self._keys = keys  # type key per node
+        self._objs = objs  # obj per node, last is the root
+        self._rets = rets  # retained size per node
+        self._types = types  # [(retained, number, flat, name), ...]
+
+    def __len__(self):
+        return len(self._objs) - 1  # excl. root
+
+    def __str__(self):
+        return 'total %r, objects %d, types %d' % (
+            self.total, len(self), len(self._types))
+
+    def _node(self, obj):
+        i = self._ix.get(id(obj), -1)
+        return i if i >= 0 and self._objs[i] is obj else -1
+
+    def dominator(self, obj):
+        '''Return the immediate dominator of *obj* or None if
+           *obj* is not reachable or dominated by the given
+           objects jointly only.
+        '''
+        i = self._node(obj)
+        return None if i < 0 else self._objs[self._idom[i]]
+
+    def flat(self, obj):
+        '''Return the flat size of *obj* or 0 if not reachable.
+        '''
+        i = self._node(obj)
+        return 0 if i < 0 else self._flats[i]
+
+    def largest(self, n=10):
+        '''Return a list of up to *n* 3-tuples (retained, flat, obj)
+           of the objects with the largest retained size, largest first.
+        '''
+        rs, fs, os = self._rets, self._flats, self._objs
+        return [(rs[i], fs[i], os[i]) for i in
+                nlargest(n, range(len(self)), key=rs.__getitem__)]
+
+    def retained(self, obj):
+        '''Return the retained size of *obj* or 0 if not reachable.
+        '''
+        i = self._node(obj)
+        return 0 if i < 0 else self._rets[i]
+
+    @property
+    def total(self):
+        '''Get the total flat size of all reachable objects (int).
+        '''
+        return self._rets[-1]
+
+    def types(self):
+        '''Return a list of 4-tuples (retained, number, flat, name)
+           per type, largest retained size first.  The retained size
+           of a type is the total flat size of all objects dominated
+           by any instance of that type.
+        '''
+        return list(self._types)
+
+
+class Asizer(object):
+    '''Sizer state and options to accumulate sizes.
+
+       An **Asizer** instance is not thread-safe, use a separate
+       instance in each thread.  Functions **asized**, **asizeof**
+       and **asizesof** do so and are thread-safe and reentrant.
+    '''
+    _above_  = 1024   # rank only objs of size 1K+
+    _align_  = 8  # alignment, power-of-2
+    _baseline_ = None  # Abaseline
+    _budget_ = 0  # seconds, unlimited
+    _cache   = None   # _Cache or None
+    _clip_   = 80
+    _code_   = False
+    _cutoff_ = 0  # in percent
+    _derive_ = False
+    _detail_ = 0  # for Asized only
+    _exclude_ = ()
     _frames_ = False
+    _immortal_ = True
     _infer_  = False
     _limit_  = 100
+    _maxobjs_ = 0  # unlimited
+    _compact_ = False  # for Asized only
+    _sample_ = 0  # no sampling
     _stats_  = 0
+    _top_    = 100    # largest objs ranked
 
+    _deadline = 0  # see _budget_
     _depth   = 0  # deepest recursion
+    _excl_c  = None  # {key: excluded}, checked by _excl_p
     _excl_d  = None  # {}
+    _excl_p  = None  # matcher, see option exclude
     _ign_d   = _kind_ignored
     _incl    = _NN  # or ' (incl. code)'
     _mask    = 7   # see _align_
     _missed  = 0   # due to errors
+    _pending = 0   # due to budget
     _profile = False  # no profiling
     _profs   = None   # {}
     _ranked  = 0
-    _ranks   = []     # type: List[_Rank] # sorted by decreasing size
+    _ranks   = []     # type: List[tuple] # min-heap of (size, n, _Rank)
+    _sampled = 0      # containers
     _seen    = None   # {}
     _stream  = None   # I/O stream for printing
+    _tops    = None   # {key: min-heap}, per type
     _total   = 0      # total size
+    _truncated = False  # budget exhausted
+    _var     = 0      # variance of _total
+    _visited = 0      # objects, this call
 
     def __init__(self, **opts):
         '''New **Asizer** accumulator.
@@ -1747,9 +3187,28 @@ class Asizer(object):
            See this module documentation for more details.
            See method **reset** for all available options and defaults.
         '''
+        self._excl_c = {}
         self._excl_d = {}
         self.reset(**opts)
 
+    def _buffer(self, key, obj, size):
+        '''Return the flat *size* of buffer exporter *obj*,
+           including the bytes of its buffer charged first.
+        '''
+        try:
+            a, n = _buffer_range(obj)
+        except Exception:  # released, closed, etc.
+            return size
+        if a and n > 0:
+            b = self._buffers
+            f = _buffer_types[key]
+            if f is None:  # view, buffer not included
+                b.views.append((a, n))
+            else:
+                o = f(obj)
+                size -= o - (o * b.charge(a, n)) // n
+        return size
+
     def _c100(self, stats):
         '''Cutoff as percentage (for backward compatibility)
         '''
@@ -1757,30 +3216,354 @@ class Asizer(object):
         c = int((stats - s) * 100.0 + 0.5) or self.cutoff
         return s, c
 
+    def _cached(self, typedef, obj, deep):
+        '''Return a 2-tuple with the total size of the referents of
+           an immutable *obj* from the cache and None or with 0 and
+           an iterator over the referents if *obj* is not cached.
+        '''
+        c = self._cache
+        o = (self._mask, self._code_, self._derive_, self._frames_,
+             self._ign_d, self._infer_)  # sizing options
+        e = c.get(obj, o)
+        if e is None:  # not cached
+            e = self._cachewalk(typedef, obj)
+            c.put(obj, o, e)
+        if e:
+            d = deep + e[2]
+            if d <= self._limit_:
+                if self._depth < d:
+                    self._depth = d
+                n, s = self._seen.newsizes(e[0], e[1])
+                self._visited += n
+                return s, None
+        r = typedef.fast[1]
+        return 0, (r(obj) if r else iter(typedef.refs(obj, False)))
+
+    def _cachewalk(self, typedef, obj):
+        '''Size all referents of an immutable *obj* and return a
+           3-tuple (ids, sizes, height) or () if any referent is
+           not immutable.
+        '''
+        code, ign, mask = self._code_, self._ign_d, self._mask
+        ids, ss, h = _array('Q'), _array('Q'), 0
+        ok, seen = set(), {id(obj)}  # ok: ids of frozen __dict__s
+        if _isfrozen(type(obj)):
+            ok.add(id(_dictof(obj)))
+        r = typedef.fast[1]  # all referents
+        stack = [(1, r(obj) if r else iter(typedef.refs(obj, False)))]
+        while stack:
+            d, r = stack[-1]
+            for o in r:
+                i = id(o)
+                if i in seen:
+                    continue
+                seen.add(i)
+                k = type(o)
+                if k in _cache_types or i in ok:
+                    pass
+                elif _isfrozen(k):
+                    ok.add(id(_dictof(o)))
+                else:  # mutable
+                    return ()
+                t = _typedefs.get(k, None)
+                if not t:  # new typedef
+                    t = self._typedef(k, o)
+                s, q = 0, None
+                if (t.both or code) and t.kind is not ign:
+                    s = t.fast[0](o)
+                    if mask:
+                        s = (s + mask) & ~mask
+                    if t.refs:
+                        q = t.fast[1]
+                        q = q(o) if q else iter(t.refs(o, False))
+                ids.append(i)
+                ss.append(s)
+                if h < d:
+                    h = d
+                if q is not None:
+                    stack.append((d + 1, q))
+                    break
+            else:
+                stack.pop()
+        return ids, ss, h
+
     def _clear(self):
         '''Clear state.
         '''
+        self._buffers = _Buffers()
         self._depth = 0   # recursion depth reached
         self._incl = _NN  # or ' (incl. code)'
         self._missed = 0   # due to errors
+        self._pending = 0
         self._profile = False
         self._profs = {}
         self._ranked = 0
         self._ranks = []
-        self._seen = _Seen()
+        self._sampled = 0
+        self._seen = _Seen(self._baseline_)
+        self._tops = {}
         self._total = 0   # total size
+        self._truncated = False
+        self._var = 0
+        self._visited = 0
         for k in _keys(self._excl_d):
             self._excl_d[k] = 0
         # don't size, profile or rank private, possibly large objs
         m = sys.modules[__name__]
-        self.exclude_objs(self, self._excl_d, self._profs, self._ranks,
-                                self._seen, m, m.__dict__, m.__doc__,
-                               _typedefs)
+        b = self._buffers
+        self.exclude_objs(self, self._excl_c, self._excl_d, self._profs, self._ranks,
+                                self._tops, self._seen, self._seen.pages, m, m.__dict__,
+                                m.__doc__, _typedefs, b, b.his, b.los, b.views)
+
+    def _dominators(self, objs, owners=False, nested=False):  # MCCABE 28
+        '''Return an **Aretained** instance with the dominator
+           tree of all objects reachable from the given *objs*,
+           using the algorithm of Cooper, Harvey and Kennedy
+           <https://www.cs.tufts.edu/~nr/cs257/archive/keith-cooper/dom14.pdf>.
+
+           If *owners* is True, return a 2-tuple with the **Aretained**
+           instance and the dict returned by method **_owners**, see
+           there for *nested*.
+        '''
+        excl, seen, ign = self._excl_d, self._seen, self._ign_d
+        code, mask, limit = self._code_, self._mask, self._limit_
+        imm = () if self._immortal_ else _immortal_types
+        xc, xp = self._excl_c, self._excl_p
+        base = seen.base
+        gs = set(map(id, objs))  # given modules are never nested
+        # depth-first walk from node 0, a pseudo-object referring
+        # to the given objs, numbering the nodes in post-order
+        ix, os, ks, fs = {}, [None], [None], _array('Q', [0])
+        us, vs, post = _array('q'), _array('q'), _array('q')
+        self.exclude_objs(ix, os, ks, fs, us, vs, post)
+        stack = [(0, iter(objs), 0)]
+        while stack:
+            u, r, d = stack[-1]
+            for o in r:
+                i = id(o)
+                v = ix.get(i, None)
+                if v is None:
+                    ix[i] = v = -1  # skipped
+                    if seen.get(i, 1) < 0:  # excluded obj
+                        continue
+                    if base and i in base and i not in gs:
+                        continue  # seen before
+                    k = type(o)
+                    if k is _Type_type:
+                        k = _claskey(o)
+                    if k in excl or (k in imm and _isimmortal(o)) or (xp and
+                       k not in xc and self._excluded(k, o if k is not type(o) else k)):
+                        continue
+                    t = _typedefs.get(k, None)
+                    if not t:  # new typedef
+                        t = self._typedef(k, o)
+                    if not ((t.both or code) and t.kind is not ign):
+                        continue
+                    z, q = t.fast  # compiled callables
+                    z = z(o)  # flat size
+                    if mask:
+                        z = (z + mask) & ~mask
+                    ix[i] = v = len(os)
+                    os.append(o)
+                    ks.append(k)
+                    fs.append(z)
+                    us.append(u)
+                    vs.append(v)
+                    if t.refs and d < limit and not (d and ismodule(o)
+                                                     and i not in gs):
+                        q = q(o) if q else iter(t.refs(o, False))
+                        stack.append((v, q, d + 1))
+                        break  # walk o's referents first
+                    post.append(v)
+                elif v > 0 and v != u:
+                    us.append(u)
+                    vs.append(v)
+            else:  # all referents walked
+                post.append(u)
+                stack.pop()
+        # renumber the nodes in post-order, the root last
+        n = r = len(post)
+        po = _array('q', bytes(n * 8))
+        for i, v in enumerate(post):
+            po[v] = i
+        r -= 1
+        for i, v in _items(ix):
+            if v > 0:
+                ix[i] = po[v]
+        os = [os[v] for v in post]
+        ks = [ks[v] for v in post]
+        fs = _array('Q', map(fs.__getitem__, post))
+        # predecessors of each node
+        ps = _array('q', bytes((n + 1) * 8))
+        for v in vs:
+            ps[po[v] + 1] += 1
+        ps = _array('q', accumulate(ps))  # offsets
+        pz, j = _array('q', ps), _array('q', bytes(len(vs) * 8))
+        for u, v in zip(us, vs):
+            v = po[v]
+            j[pz[v]] = po[u]
+            pz[v] += 1
+        del us, vs, post, po, pz
+        # iterate to the immediate dominators, ...
+        idom = _array('q', [-1]) * n
+        idom[r] = r
+        c = True
+        while c:
+            c = False
+            for v in range(r - 1, -1, -1):  # ... in reverse post-order
+                d = -1
+                for u in j[ps[v]:ps[v + 1]]:
+                    if idom[u] < 0:  # not yet processed
+                        pass
+                    elif d < 0:
+                        d = u
+                    else:  # intersect
+                        while u != d:
+                            while u < d:
+                                u = idom[u]
+                            while d < u:
+                                d = idom[d]
+                if idom[v] != d:
+                    idom[v] = d
+                    c = True
+        # retained sizes, dominators have higher post-order numbers
+        rs = _array('Q', fs)
+        for v in range(r):
+            rs[idom[v]] += rs[v]
+        if owners:
+            owners = self._owners(objs, ix, idom, j, ps, rs, nested)
+        del j, ps
+        # type totals, retained only by the outermost instances
+        cs = _array('q', bytes((n + 1) * 8))
+        for v in range(r):
+            cs[idom[v] + 1] += 1
+        cs = _array('q', accumulate(cs))  # offsets
+        cz, j = _array('q', cs), _array('q', bytes(r * 8))
+        for v in range(r):
+            u = idom[v]
+            j[cz[u]] = v
+            cz[u] += 1
+        del cz
+        ts, on = {}, {}  # {key: [retained, number, flat]}, {key: nesting}
+        stack = list(j[cs[r]:cs[r + 1]])
+        while stack:
+            v = stack.pop()
+            if v < 0:  # exit
+                on[ks[~v]] -= 1
+                continue
+            k = ks[v]
+            t = ts.get(k, None)
+            if t is None:
+                ts[k] = t = [0, 0, 0]
+            if not on.get(k, 0):
+                t[0] += rs[v]
+            t[1] += 1
+            t[2] += fs[v]
+            on[k] = on.get(k, 0) + 1
+            stack.append(~v)
+            stack.extend(j[cs[v]:cs[v + 1]])
+        ts = sorted(((t[0], t[1], t[2], self._prepr(k)) for k, t in
+                     _items(ts)), reverse=True)
+        a = Aretained(ix, os, ks, fs, idom, rs, ts)
+        return a if owners is False else (a, owners)
+
+    def _excluded(self, key, typ):
+        '''Is type or class *typ* excluded by option *exclude*,
+           checked once for each *key*?
+        '''
+        x = self._excl_c[key] = bool(self._excl_p(typ))
+        if x:
+            self._excl_d[key] = 0
+        return x
+
+    def _leafs(self, objs, deep, pid):
+        '''Return the total size of all *objs* in a single
+           pass or None if any of the *objs* is not a leaf.
+        '''
+        excl, code, ign = self._excl_d, self._code_, self._ign_d
+        xc, xp = self._excl_c, self._excl_p
+        for k in set(map(type, objs)):
+            t = _typedefs.get(k, None)
+            if not (t and (t.both or code) and t.kind is not ign) \
+                   or t.refs or t.fast[0] is not _getsizeof \
+                   or k is _Type_type or k in excl or k in _buffer_types \
+                   or (xp and k not in xc and self._excluded(k, k)):
+                return None  # size objs one by one
+        if not self._immortal_:
+            objs = [o for o in objs if not (type(o) in _immortal_types
+                                            and _isimmortal(o))]
+        objs = self._seen.news(objs)
+        self._visited += len(objs)
+        ss = list(map(_getsizeof, objs))
+        m = self._mask
+        if m:  # align each size
+            ss = [(s + m) & ~m for s in ss]
+        if self._profile:
+            for o, s in zip(objs, ss):
+                p = self._prof(type(o))
+                p.update(o, s)
+                p.deeps[s.bit_length()] += 1
+        a = self._above_ if self._stats_ else 0
+        if a > 0 and ss and max(ss) > a:
+            for o, s in zip(objs, ss):
+                if s > a:
+                    self._rank(type(o), o, s, deep, pid)
+        return sum(ss)
+
+    def _largest(self, key=None):
+        '''Return the ranked objects as _Rank list, sorted by
+           decreasing size, overall or for the *key* type.
+        '''
+        rs = self._ranks if key is None else self._tops.get(key, ())
+        return [r for _, _, r in sorted(rs, reverse=True)[:self._top_]]
 
     def _nameof(self, obj):
-        '''Return the object's name.
+        '''Return the object's name, repr or lazy name.
+        '''
+        if type(obj) in _atomic_types:  # no __name__
+            return _repr(obj, clip=self._clip_)
+        return _nameof(obj, _NN) or _lazyrepr(obj, clip=self._clip_)
+
+    def _owners(self, objs, ix, idom, preds, offs, rets, nested=False):
+        '''Return a dict {owners: size} with the total retained size
+           of all objects reachable from the same given *objs*, the
+           *owners* as bitset of the indices of those *objs*.
+
+           Every object below a child of the root in the dominator
+           tree is reachable from the same *objs* as that child and
+           all other references into that subtree go to the child.
+
+           A given object reachable from other given objects is owned
+           by those too if *nested* is True, otherwise only by itself.
         '''
-        return _nameof(obj, _NN) or self._repr(obj)
+        r = len(idom) - 1  # root
+        ws = {}  # {top node: owners}
+        for b, o in enumerate(objs):
+            v = ix.get(id(o), -1)
+            if v >= 0:
+                ws[v] = ws.get(v, 0) | (1 << b)
+        # the top node of each node, in reverse post-order
+        tops = _array('q', idom)
+        for v in range(r - 1, -1, -1):
+            u = idom[v]
+            tops[v] = v if u == r else tops[u]
+        js = [v for v in range(r - 1, -1, -1) if idom[v] == r and
+                                                 (nested or v not in ws)]
+        c = True
+        while c:  # until no owners change
+            c = False
+            for v in js:
+                b = ws.get(v, 0)
+                for u in preds[offs[v]:offs[v + 1]]:
+                    if u != r:
+                        b |= ws.get(tops[u], 0)
+                if b != ws.get(v, 0):
+                    ws[v] = b
+                    c = True
+        d = {}
+        for v, b in _items(ws):
+            d[b] = d.get(b, 0) + rets[v]
+        return d
 
     def _prepr(self, obj):
         '''Like **prepr()**.
@@ -1809,97 +3592,248 @@ class Asizer(object):
         return p
 
     def _rank(self, key, obj, size, deep, pid):
-        '''Rank 100 largest objects by size.
-        '''
-        rs = self._ranks
-        # bisect, see <http://GitHub.com/python/cpython/blob/master/Lib/bisect.py>
-        i, j = 0, len(rs)
-        while i < j:
-            m = (i + j) // 2
-            if size < rs[m].size:
-                i = m + 1
-            else:
-                j = m
-        if i < 100:
-            r = _Rank(key, obj, size, deep, pid)
-            rs.insert(i, r)
-            self.exclude_objs(r)  # XXX superfluous?
-            while len(rs) > 100:
-                rs.pop()
-            # self._ranks[:] = rs[:100]
-        self._ranked += 1
+        '''Rank the *top* largest objects by size, overall and
+           per type, in bounded min-heaps of (size, n, _Rank).
+        '''
+        n = self._ranked = self._ranked + 1
+        r, K = None, self._top_
+        ts = self._tops.get(key, None)
+        if ts is None:
+            self._tops[key] = ts = []
+            self.exclude_objs(ts)
+        # ties go to the later object, smallest n is evicted
+        for rs in (self._ranks, ts):
+            if len(rs) < K or size >= rs[0][0]:
+                if r is None:  # only for entrants
+                    r = _Rank(key, obj, size, deep, pid)
+                    self.exclude_objs(r)  # XXX superfluous?
+                if len(rs) < K:
+                    heappush(rs, (size, n, r))
+                else:
+                    heapreplace(rs, (size, n, r))
 
     def _repr(self, obj):
         '''Like ``repr()``.
         '''
         return _repr(obj, clip=self._clip_)
 
-    def _sizer(self, obj, pid, deep, sized):  # MCCABE 19
-        '''Size an object, recursively.
+    def _sizer(self, obj, pid, deep, sized):  # MCCABE 31
+        '''Size an object and its referents, iteratively.
+
+           Objects with referents to be sized are kept on an
+           explicit stack, avoiding recursion and any limit on
+           the depth of the object graph.  The given object
+           itself is the only referent of a pseudo-object at
+           the bottom of the stack.
         '''
-        s, f, i = 0, 0, id(obj)
-        if i not in self._seen:
-            self._seen[i] = 1
-        elif deep or self._seen[i]:
-            # skip obj if seen before
-            # or if ref of a given obj
-            if self._seen[i]:
-                self._seen.again(i)
-            if sized:
-                s = sized(s, f, name=self._nameof(obj))
-                self.exclude_objs(s)
-            return s  # zero
-        else:  # deep == seen[i] == 0
-            self._seen.again(i)
-        try:
-            k, rs = _objkey(obj), []
-            if k in self._excl_d:
-                self._excl_d[k] += 1
-            else:
-                v = _typedefs.get(k, None)
-                if not v:  # new typedef
-                    _typedefs[k] = v = _typedef(obj, derive=self._derive_,
-                                                     frames=self._frames_,
-                                                      infer=self._infer_)
-                if (v.both or self._code_) and v.kind is not self._ign_d:
-                    s = f = v.flat(obj, self._mask)  # flat size
-                    if self._profile:
-                        # profile based on *flat* size
-                        self._prof(k).update(obj, s)
-                    # recurse, but not for nested modules
-                    if v.refs and deep < self._limit_ \
-                              and not (deep and ismodule(obj)):
-                        # add sizes of referents
-                        z, d = self._sizer, deep + 1
-                        if sized and deep < self._detail_:
-                            # use named referents
-                            self.exclude_objs(rs)
-                            for o in v.refs(obj, True):
-                                if isinstance(o, _NamedRef):
-                                    r = z(o.ref, i, d, sized)
-                                    r.name = o.name
-                                else:
-                                    r = z(o, i, d, sized)
-                                    r.name = self._nameof(o)
-                                rs.append(r)
-                                s += r.size
-                        else:  # just size and accumulate
-                            for o in v.refs(obj, False):
-                                s += z(o, i, d, None)
-                        # deepest recursion reached
-                        if self._depth < d:
-                            self._depth = d
-                if self._stats_ and s > self._above_ > 0:
-                    # rank based on *total* size
-                    self._rank(k, obj, s, deep, pid)
-        except RuntimeError:  # XXX RecursionLimitExceeded:
-            self._missed += 1
-        if not deep:
-            self._total += s  # accumulate
+        if self._truncated:  # budget exhausted
+            self._pending += 1
+            return sized(0, 0, name=self._nameof(obj)) if sized else 0
+        # exclude the Asized instances, but not the _Tree node indices
+        xs = sized is not None and not isinstance(sized, _Tree)
+        excl, seen, ign = self._excl_d, self._seen, self._ign_d
+        code, mask, prof = self._code_, self._mask, self._profile
+        imm = () if self._immortal_ else _immortal_types
+        xc, xp = self._excl_c, self._excl_p
+        pages, base = seen.pages, seen.base  # bitmaps
+        bufs = _buffer_types if _buffer_range else ()
+        detail, limit = self._detail_, self._limit_
+        above = self._above_ if self._stats_ else 0
+        maxobjs, deadline, c = self._maxobjs_, self._deadline, 0
+        # no bulk or cached sizes for budgets, profiles,
+        # ranks or excluded types
+        bulk = not (maxobjs or deadline)
+        cache = None if (self._stats_ or excl or xp or imm or not bulk) \
+                else self._cache
+        sample = self._sample_
+        stack = []  # _Visit instances
+        self.exclude_objs(stack)
         if sized:
-            s = sized(s, f, name=self._nameof(obj), refs=rs)
-            self.exclude_objs(s)
-        return s
+            rs = []
+            self.exclude_objs(rs)
+        else:
+            rs = None
+        z = _Visit(None, None, 0, deep - 1, 0, iter((obj,)), rs)
+        z.id = pid  # pseudo-object
+        stack.append(z)
+        while stack:
+            v = stack[-1]
+            d, p, rs = v.deep + 1, v.id, v.refs
+            try:
+                for o in v.itor:
+                    if rs is None:  # just size and accumulate
+                        n = None
+                    elif isinstance(o, _NamedRef):  # use named referents
+                        n, o = o.name, o.ref
+                    else:
+                        n = self._nameof(o)
+                    s, f, i = 0, 0, id(o)
+                    # skip immortal o and its referents, neither
+                    # sized nor counted nor recorded as seen
+                    x = imm and type(o) in imm and _isimmortal(o)
+                    if x:
+                        pass
+                    elif i not in seen and not (pages and seen.had(i)) \
+                                       and not (base and seen.based(i)):
+                        c += 1
+                        if (maxobjs and c + self._visited > maxobjs) or \
+                           (deadline and not c & 255 and _timer() > deadline):
+                            c -= 1
+                            self._truncate(stack)
+                            break
+                        seen[i] = 1
+                        if not c & 255 and len(seen) > seen.max:
+                            seen.flush()  # compact
+                    elif d or seen[i]:
+                        # skip o if seen before
+                        # or if ref of a given obj
+                        if seen[i]:
+                            seen.again(i)
+                        x = True
+                    else:  # d == seen[i] == 0
+                        seen.again(i)
+                        c += 1
+                    if x:
+                        if rs is not None:
+                            s = sized(s, f, name=n)
+                            if xs:
+                                seen.setdefault(id(s), -1)  # exclude_objs
+                            rs.append(s)
+                        elif v.items is not None:
+                            v.items.append(0)
+                        continue
+                    try:
+                        k = type(o)  # _objkey(o)
+                        if k is _Type_type:
+                            k = _claskey(o)
+                        if k in excl or (xp and k not in xc and
+                                         self._excluded(k, o if k is not type(o) else k)):
+                            excl[k] += 1
+                        else:
+                            t = _typedefs.get(k, None)
+                            if not t:  # new typedef
+                                t = self._typedef(k, o)
+                            if (t.both or code) and t.kind is not ign:
+                                z, r = t.fast  # compiled callables
+                                s = z(o)  # flat size
+                                if k in bufs:  # charge buffer once
+                                    s = self._buffer(k, o, s)
+                                if mask:
+                                    s = (s + mask) & ~mask
+                                f = s
+                                if prof:
+                                    # profile based on *flat* size
+                                    z = self._prof(k)
+                                    z.update(o, s)
+                                    if t.refs and t.leng:  # container
+                                        z.leng(o)
+                                # size referents, but not for nested modules
+                                if t.refs and d < limit and not (d and ismodule(o)):
+                                    u = w = None
+                                    m = None  # values of a managed __dict__
+                                    if t.refs is _managed_refs:  # not in a dict
+                                        m = _managed_items(o)
+                                    if rs is not None and d < detail:
+                                        # use named referents
+                                        r, u = iter(t.refs(o, True)), []
+                                        seen.setdefault(id(u), -1)
+                                    elif cache is not None and \
+                                          _iscached(k, o):
+                                        z, r = self._cached(t, o, d)
+                                        s += z
+                                        m = None  # values in r
+                                    elif m is not None:
+                                        r = iter(t.refs(o, False))
+                                    elif sample and k in _bulk_types and \
+                                          len(o) > _samples(sample, len(o)):
+                                        r, w = _sample(o, _samples(sample, len(o)))
+                                        r = iter(r)
+                                        self._sampled += 1
+                                    elif not r:
+                                        r = iter(t.refs(o, False))
+                                    elif bulk and k in _bulk_types and \
+                                          len(o) >= _bulk_min:
+                                        r = list(r(o))
+                                        z = self._leafs(r, d + 1, i)
+                                        if z is None:
+                                            r = iter(r)
+                                        else:  # all leafs sized
+                                            s += z
+                                            r = None
+                                    else:
+                                        r = r(o)
+                                    # deepest recursion reached
+                                    if self._depth <= d:
+                                        self._depth = d + 1
+                                    if w:  # sampled items
+                                        stack.append(_Sample(k, o, f, d, p, r, w, n))
+                                        break
+                                    elif r is not None:
+                                        stack.append(_Visit(k, o, f, d, p, r, u, n))
+                                        if m is not None:
+                                            self._values(stack, m, d + 1)
+                                        break  # size o's referents first
+                            if s > above > 0:
+                                # rank based on *total* size
+                                self._rank(k, o, s, d, p)
+                            if prof:  # not for excluded types
+                                z = self._profs.get(k, None)
+                                if z is not None:
+                                    z.deeps[s.bit_length()] += 1
+                    except RuntimeError:  # XXX RecursionLimitExceeded:
+                        self._missed += 1
+                    if not d:
+                        self._total += s  # accumulate
+                    if rs is None:
+                        v.size += s
+                        if v.items is not None:
+                            v.items.append(s)
+                    else:
+                        v.size += s
+                        s = sized(s, f, name=n, refs=())
+                        if xs:
+                            seen.setdefault(id(s), -1)  # exclude_objs
+                        rs.append(s)
+                else:  # all referents sized
+                    v = None
+            except RuntimeError:  # XXX RecursionLimitExceeded:
+                self._missed += 1
+                v = None
+            if v is None:  # pop and add size to referrer
+                v = stack.pop()
+                if not stack:  # pseudo-object
+                    self._visited += c
+                    return v.refs[0] if sized else v.size
+                if v.items is not None:
+                    v.estimate()
+                s = v.size
+                if v.key is None:  # values, see _values
+                    pass
+                else:
+                    if s > above > 0:
+                        # rank based on *total* size
+                        self._rank(v.key, v.obj, s, v.deep, v.pid)
+                    if prof:
+                        self._profs[v.key].deeps[s.bit_length()] += 1
+                if not v.deep:
+                    self._total += s  # accumulate
+                    self._var += v.var
+                u = stack[-1]
+                u.var += v.var
+                if u.refs is None:
+                    u.size += s
+                    if u.items is not None:
+                        u.items.append(s)
+                else:
+                    u.size += s
+                    if v.var:
+                        s = sized(s, v.flat, name=v.name, refs=v.refs or (),
+                                                          error=_error(v.var))
+                    else:
+                        s = sized(s, v.flat, name=v.name, refs=v.refs or ())
+                    if xs:
+                        seen.setdefault(id(s), -1)  # exclude_objs
+                    u.refs.append(s)
 
     def _sizes(self, objs, sized=None):
         '''Return the size or an **Asized** instance for each
@@ -1909,15 +3843,72 @@ class Asizer(object):
         self.exclude_refs(*objs)  # skip refs to objs
         s, t = {}, []
         self.exclude_objs(s, t)
+        deadline, maxobjs, k = self._deadline, self._maxobjs_, -1
         for o in objs:
             i = id(o)
             if i in s:  # duplicate
                 self._seen.again(i)
             else:
+                # check the budget for many small objs,
+                # each sized by _sizer in less than 256
+                if self._truncated:
+                    pass
+                elif maxobjs and self._visited >= maxobjs:
+                    self._truncated = True
+                elif deadline and k != (self._visited >> 8):
+                    k = self._visited >> 8
+                    if _timer() > deadline:
+                        self._truncated = True
                 s[i] = self._sizer(o, 0, 0, sized)
             t.append(s[i])
         return tuple(t)
 
+    def _start(self):
+        '''Start the budget for an **asized**, **asizeof**
+           or **asizesof** call.
+        '''
+        self._deadline = (_timer() + self._budget_) if self._budget_ else 0
+        self._pending = 0
+        self._truncated = False
+        self._visited = 0
+
+    def _truncate(self, stack):
+        '''Stop sizing, the budget is exhausted.
+        '''
+        n = 1  # the current obj
+        for v in stack:  # pending referents
+            n += length_hint(v.itor)
+            v.itor = iter(())
+        self._pending += n
+        self._truncated = True
+
+    def _typedef(self, key, obj):
+        '''Get or create and save a new typedef.
+        '''
+        with _typedefs_lock:  # double check
+            t = _typedefs.get(key, None)
+            if not t:
+                _typedefs[key] = t = _typedef(obj, derive=self._derive_,
+                                                   frames=self._frames_,
+                                                    infer=self._infer_)
+        return t
+
+    def _values(self, stack, items, deep):
+        '''Push the values of the managed __dict__ of the object on
+           top of the *stack*, as if in a ``__dict__`` pseudo-object
+           without a typedef and charged the flat size of the values.
+        '''
+        v = stack[-1]
+        z = _managed_values(v.obj)
+        v.flat -= z
+        v.size -= z
+        d, u = dict(items), None
+        if v.refs is not None and deep < self._detail_:
+            u = []  # named referents
+            self._seen.setdefault(id(u), -1)
+        r = _dict_refs(d, u is not None) if deep < self._limit_ else ()
+        stack.append(_Visit(None, d, z, deep, v.id, iter(r), u, '__dict__'))
+
     @property
     def above(self):
         '''Get the large object size threshold (int).
@@ -1930,6 +3921,108 @@ class Asizer(object):
         '''
         return self._align_
 
+    def amodules(self, *modules, **opts):
+        '''Return a list of 3-tuples (exclusive, shared, name) for
+           the given modules or all modules in ``sys.modules``, the
+           largest *exclusive* size first (with modified options, see
+           method **set**).
+
+           The *exclusive* size of a module is the size of all objects
+           reachable only from that module, i.e. the size freed if the
+           module were dropped.  The *shared* size is the size of all
+           objects reachable from that and from other modules.  Each
+           object is sized once, nested modules are not followed.
+        '''
+        if opts:
+            self.set(**opts)
+        ms, ix = [], set()
+        for m in (modules or list(sys.modules.values())):
+            if ismodule(m) and id(m) not in ix:
+                ix.add(id(m))
+                ms.append(m)
+        _, d = self._dominators(ms, owners=True)
+        rs = []
+        for i, m in enumerate(ms):
+            b = 1 << i
+            z = sum(z for o, z in _items(d) if (o & b) and o != b)
+            rs.append((d.get(b, 0), z, _nameof(m)))
+        rs.sort(key=itemgetter(0, 1), reverse=True)
+        return rs
+
+    def apaths(self, obj, n=10, **opts):
+        '''Return up to *n* of the heaviest reference paths from *obj*,
+           largest first, each an **Asized** instance with at most one
+           referent at every level (and with modified options, see
+           method **set**).
+
+           A path ends at an object with no referent attributed more
+           than half its size.  The paths are found in a single sizing,
+           using the named referents at all levels up to the *limit*.
+        '''
+        if n < 1:
+            raise _OptionError(self.apaths, n=n)
+        if opts:
+            self.set(**opts)
+        self._start()
+        d, self._detail_ = self._detail_, self._limit_
+        try:
+            r = self._sizes((obj,), _Paths(n))[0]
+        finally:
+            self._detail_ = d
+        ps = []
+        for _, p in sorted(r.paths, key=itemgetter(0), reverse=True):
+            a = t = Asized(r.size, r.flat, name=r.name)
+            while p:
+                (m, z, f), p = p
+                t.refs = t = Asized(z, f, name=m),
+                t = t[0]
+            ps.append(a)
+        return ps
+
+    def aretained(self, *objs, **opts):
+        '''Return an **Aretained** instance with the dominator tree
+           and retained sizes of all objects reachable from the given
+           objects (with modified options, see method **set**).
+        '''
+        if opts:
+            self.set(**opts)
+        return self._dominators(objs)
+
+    def ashared(self, *objs, matrix=False, **opts):
+        '''Return a list of 2-tuples (size, owners) for the given
+           objects, largest first, with *owners* a tuple of the indices
+           of the given objects reaching all objects of that total size
+           (with modified options, see method **set**).
+
+           The size for a single owner is the size exclusive to that
+           object, i.e. the size freed if that object were released.
+           All objects are sized once, in a single traversal.
+
+           If *matrix* is True, return a list of lists with the size
+           shared by each pair of given objects instead and with the
+           exclusive size of each given object on the diagonal.
+        '''
+        if opts:
+            self.set(**opts)
+        _, d = self._dominators(objs, owners=True, nested=True)
+        n = len(objs)
+        if matrix:
+            m = [[0] * n for _ in range(n)]
+            for b, z in _items(d):
+                js = [j for j in range(n) if (b >> j) & 1]
+                if len(js) == 1:
+                    m[js[0]][js[0]] += z
+                else:
+                    for i in js:
+                        for j in js:
+                            if i != j:
+                                m[i][j] += z
+            return m
+        rs = [(z, tuple(j for j in range(n) if (b >> j) & 1))
+              for b, z in _items(d)]
+        rs.sort(key=itemgetter(0), reverse=True)
+        return rs
+
     def asized(self, *objs, **opts):
         '''Size each object and return an **Asized** instance with
            size information and referents up to the given detail
@@ -1941,7 +4034,13 @@ class Asizer(object):
         '''
         if opts:
             self.set(**opts)
-        t = self._sizes(objs, Asized)
+        self._start()
+        if self._compact_:  # no Asized instances
+            s = _Tree()
+            t = tuple(AsizedTree(s, i) for i in self._sizes(objs, s))
+            s._ix = None  # interned
+        else:
+            t = self._sizes(objs, AsizedEstimate if self._sample_ else Asized)
         return t[0] if len(t) == 1 else t
 
     def asizeof(self, *objs, **opts):
@@ -1950,6 +4049,7 @@ class Asizer(object):
         '''
         if opts:
             self.set(**opts)
+        self._start()
         self.exclude_refs(*objs)  # skip refs to objs
         return sum(self._sizer(o, 0, 0, None) for o in objs)
 
@@ -1961,8 +4061,55 @@ class Asizer(object):
         '''
         if opts:
             self.set(**opts)
+        self._start()
         return self._sizes(objs, None)
 
+    def atasks(self, *tasks, **opts):
+        '''Size the given asyncio tasks and return a list of 3-tuples
+           (size, name, task), largest first, with *name* the qualified
+           name of the task's coroutine (and with modified options, see
+           method **set**).
+
+           The size of a task includes its coroutine chain, the locals
+           of the coroutine frames and the awaited futures, but not the
+           event loop.  Objects shared by several tasks are sized once.
+
+           If option *group* is True, return a list of 3-tuples (size,
+           number, name) per coroutine name instead, largest first.
+        '''
+        g = opts.pop('group', False)
+        if opts:
+            self.set(**opts)
+        self._start()
+        self.exclude_objs(*set(t.get_loop() for t in tasks))
+        ts = [(z, _qualname(t), t) for z, t in zip(self._sizes(tasks), tasks)]
+        if g:
+            d = {}
+            for z, n, _ in ts:
+                s, c = d.get(n, (0, 0))
+                d[n] = s + z, c + 1
+            ts = [(s, c, n) for n, (s, c) in d.items()]
+        ts.sort(key=itemgetter(0), reverse=True)
+        return ts
+
+    @property
+    def baseline(self):
+        '''Get the *baseline* option (**Abaseline** or None).
+        '''
+        return self._baseline_
+
+    @property
+    def budget(self):
+        '''Get the time budget per call in seconds (float).
+        '''
+        return self._budget_
+
+    @property
+    def cache(self):
+        '''Get the cache option (bool).
+        '''
+        return self._cache is not None
+
     @property
     def clip(self):
         '''Get the clipped string length (int).
@@ -1975,6 +4122,12 @@ class Asizer(object):
         '''
         return self._code_
 
+    @property
+    def compact(self):
+        '''Return compact **AsizedTree** instances (bool).
+        '''
+        return self._compact_
+
     @property
     def cutoff(self):
         '''Stats cutoff (int).
@@ -1997,7 +4150,13 @@ class Asizer(object):
     def duplicate(self):
         '''Get the number of duplicate objects seen so far (int).
         '''
-        return sum(1 for v in _values(self._seen) if v > 1)  # == len
+        return self._seen.counts()[2]
+
+    @property
+    def exclude(self):
+        '''Get the *exclude* module patterns, base classes and callables (tuple).
+        '''
+        return self._exclude_
 
     def exclude_objs(self, *objs):
         '''Exclude the specified objects from sizing, profiling and ranking.
@@ -2027,6 +4186,13 @@ class Asizer(object):
                 if t and t not in self._excl_d:
                     self._excl_d[t] = 0
 
+    @property
+    def error(self):
+        '''Get the 95% error bound of the total size, estimated
+           from sampled containers, see option *sample* (int).
+        '''
+        return _error(self._var)
+
     @property
     def excluded(self):
         '''Get the types being excluded (tuple).
@@ -2039,30 +4205,82 @@ class Asizer(object):
         '''
         return self._frames_
 
+    def histograms(self):
+        '''Return the histograms of the flat size, the deep size
+           and the length of containers for each type profiled,
+           with *stats* 2 or more, as dict *{type: dict(flat=...,
+           deep=..., leng=...)}*.  Each histogram is a list of
+           3-tuples *(low, high, count)*, the number of objects
+           with a size respectively length between *low* and
+           *high* inclusive, in log2 bins, from smallest to
+           largest and excluding empty bins.
+        '''
+        return dict((self._prepr(k), p.histograms())
+                    for k, p in _items(self._profs))
+
     @property
     def ignored(self):
         '''Ignore certain types (bool).
         '''
         return True if self._ign_d else False
 
+    @property
+    def immortal(self):
+        '''Size or skip immortal and interned objects (bool).
+        '''
+        return self._immortal_
+
     @property
     def infer(self):
         '''Infer types (bool).
         '''
         return self._infer_
 
+    def largest(self, typ=None):
+        '''Return the *top* largest objects ranked so far as
+           a list of 2-tuples (size, obj) by decreasing size,
+           overall or only those of type *typ*.  The obj is
+           *None* if no longer alive.  Objects are ranked only
+           with *stats* and if their size exceeds *above*.
+        '''
+        t = []
+        for r in self._largest(typ):
+            o = r.objref() if r.weak else r.objref
+            t.append((r.size, o))
+        return t
+
     @property
     def limit(self):
         '''Get the recursion limit (int).
         '''
         return self._limit_
 
+    @property
+    def maxobjs(self):
+        '''Get the maximum number of objects per call (int).
+        '''
+        return self._maxobjs_
+
     @property
     def missed(self):
         '''Get the number of objects missed due to errors (int).
         '''
         return self._missed
 
+    @property
+    def overhead(self):
+        '''Get the peak size in bytes of the record of the
+           objects seen so far, the sizer's overhead (int).
+        '''
+        return self._seen.overhead()
+
+    @property
+    def pending(self):
+        '''Get the number of objects not sized by the last call
+           due to its budget (int), at least.
+        '''
+        return self._pending
+
     def print_largest(self, w=0, cutoff=0, **print3options):
         '''Print the largest objects.
 
@@ -2075,13 +4293,14 @@ class Asizer(object):
             *print3options* -- some keyword arguments, like Python 3+ print
         '''
         c = int(cutoff) if cutoff else self._cutoff_
-        n = min(len(self._ranks), max(c, 0))
+        rs = self._largest()
+        n = min(len(rs), max(c, 0))
         s = self._above_
         if n > 0 and s > 0:
             self._printf('%s%*d largest object%s (of %d over %d bytes%s)', linesep,
                           w, n, _plural(n), self._ranked, s, _SI(s), **print3options)
-            id2x = dict((r.id, i) for i, r in enumerate(self._ranks))
-            for r in self._ranks[:n]:
+            id2x = dict((r.id, i) for i, r in enumerate(rs))
+            for r in rs[:n]:
                 s, t = r.size, r.format(self._clip_, id2x)
                 self._printf('%*d bytes%s: %s', w, s, _SI(s), t, **print3options)
 
@@ -2205,10 +4424,22 @@ class Asizer(object):
             self._printf('%*d object%s %s', w, n, _plural(n), 'ranked', **print3options)
         n = self.missed
         self._printf('%*d object%s %s', w, n, _plural(n), 'missed', **print3options)
+        if self._truncated:
+            n = self.pending
+            self._printf('%*d object%s %s', w, n, _plural(n), 'pending, truncated', **print3options)
         n = self.duplicate
         self._printf('%*d duplicate%s', w, n, _plural(n), **print3options)
+        n = self.shared
+        if n > 0:
+            self._printf('%*d bytes%s shared buffers', w, n, _SI(n), **print3options)
+        n = self.sampled
+        if n > 0:
+            self._printf('%*d container%s %s', w, n, _plural(n), 'sampled', **print3options)
+            self._printf('%*d bytes error (95%%)', w, self.error, **print3options)
         if self._depth > 0:
             self._printf('%*d deepest recursion', w, self._depth, **print3options)
+        n = self.overhead
+        self._printf('%*d bytes%s overhead (peak)', w, n, _SI(n), **print3options)
 
     def print_typedefs(self, w=0, **print3options):
         '''Print the types and dict tables.
@@ -2241,9 +4472,10 @@ class Asizer(object):
         '''
         return self._ranked
 
-    def reset(self, above=1024, align=8, clip=80, code=False,  # PYCHOK too many args
-                    cutoff=10, derive=False, detail=0, frames=False, ignored=True,
-                    infer=False, limit=100, stats=0, stream=None, **extra):
+    def reset(self, above=1024, align=8, baseline=None, budget=0, cache=False, clip=80,  # PYCHOK too many args
+                    code=False, compact=False, cutoff=10, derive=False, detail=0,
+                    exclude=(), frames=False, ignored=True, immortal=True, infer=False, limit=100,
+                    maxobjs=0, sample=0, stats=0, stream=None, top=100, **extra):
         '''Reset sizing options, state, etc. to defaults.
 
            The available options and default values are:
@@ -2252,39 +4484,63 @@ class Asizer(object):
 
                 *align=8*      -- size alignment
 
+                *baseline=None* -- **Abaseline** of objects seen before
+
+                *budget=0*     -- time limit per call in seconds
+
+                *cache=False*  -- use cached sizes of immutable objects
+
                 *code=False*   -- incl. (byte)code size
 
+                *compact=False* -- return compact **AsizedTree** instances
+
                 *cutoff=10*    -- limit large objects or profiles stats
 
                 *derive=False* -- derive from super type
 
                 *detail=0*     -- **Asized** refs level
 
+                *exclude=()*   -- exclude types by module, base class or predicate
+
                 *frames=False* -- ignore frame objects
 
                 *ignored=True* -- ignore certain types
 
+                *immortal=True* -- incl. immortal and interned objects
+
                 *infer=False*  -- try to infer types
 
                 *limit=100*    -- recursion limit
 
+                *maxobjs=0*    -- object limit per call
+
+                *sample=0*     -- sample items of large containers
+
                 *stats=0*      -- print statistics, see function **asizeof**
 
                 *stream=None*  -- output stream for printing
 
+                *top=100*      -- number of largest objects ranked
+
            See function **asizeof** for a description of the options.
         '''
         if extra:
             raise _OptionError(self.reset, Error=KeyError, **extra)
+        if not (baseline is None or isinstance(baseline, Abaseline)):
+            raise _OptionError(self.reset, baseline=baseline)
         # options
         self._above_ = above
         self._align_ = align
+        self._baseline_ = baseline
+        self._cache = _cache if cache else None
         self._clip_ = clip
         self._code_ = code
+        self._compact_ = compact
         self._cutoff_ = cutoff
         self._derive_ = derive
         self._detail_ = detail  # for Asized only
         self._frames_ = frames
+        self._immortal_ = immortal
         self._infer_ = infer
         self._limit_ = limit
         self._stats_ = stats
@@ -2295,16 +4551,31 @@ class Asizer(object):
             self._ign_d = None
         # clear state
         self._clear()
-        self.set(align=align, code=code, cutoff=cutoff, stats=stats)
+        self.set(align=align, budget=budget, code=code, cutoff=cutoff,
+                 exclude=exclude, maxobjs=maxobjs, sample=sample, stats=stats,
+                 top=top)
+
+    @property
+    def sample(self):
+        '''Get the sample option (int or float).
+        '''
+        return self._sample_
+
+    @property
+    def sampled(self):
+        '''Get the number of containers sized from samples (int).
+        '''
+        return self._sampled
 
     @property
     def seen(self):
         '''Get the number objects seen so far (int).
         '''
-        return sum(v for v in _values(self._seen) if v > 0)
+        return self._seen.counts()[0]
 
-    def set(self, above=None, align=None, code=None, cutoff=None,
-                  frames=None, detail=None, limit=None, stats=None):
+    def set(self, above=None, align=None, budget=None, code=None, compact=None,
+                  cutoff=None, detail=None, exclude=None, frames=None, immortal=None,
+                  limit=None, maxobjs=None, sample=None, stats=None, top=None):
         '''Set some sizing options.  See also **reset**.
 
            The available options are:
@@ -2313,18 +4584,32 @@ class Asizer(object):
 
                 *align*  -- size alignment
 
+                *budget* -- time limit per call in seconds
+
                 *code*   -- incl. (byte)code size
 
+                *compact* -- return compact **AsizedTree** instances
+
                 *cutoff* -- limit large objects or profiles stats
 
                 *detail* -- **Asized** refs level
 
+                *exclude* -- exclude types by module, base class or predicate
+
                 *frames* -- size or ignore frame objects
 
+                *immortal* -- size or skip immortal and interned objects
+
                 *limit*  -- recursion limit
 
+                *maxobjs* -- object limit per call
+
+                *sample* -- sample items of large containers
+
                 *stats*  -- print statistics, see function **asizeof**
 
+                *top*    -- number of largest objects ranked
+
            Any options not set remain unchanged from the previous setting.
         '''
         # adjust
@@ -2339,16 +4624,42 @@ class Asizer(object):
                 m = 0
             self._align_ = align
             self._mask   = m
+        if budget is not None:
+            if budget < 0:
+                raise _OptionError(self.set, budget=budget)
+            self._budget_ = budget
         if code is not None:
             self._code_ = code
             if code:  # incl. (byte)code
                 self._incl = ' (incl. code)'
+        if compact is not None:
+            self._compact_ = compact
         if detail is not None:
             self._detail_ = detail
+        if exclude is not None:
+            p = _matcher(self.set, exclude)
+            for k, x in _items(self._excl_c):
+                if x:  # excluded by the previous matcher
+                    self._excl_d.pop(k, None)
+            self._excl_c.clear()
+            self._excl_p = p
+            self._exclude_ = tuple(exclude)
         if frames is not None:
             self._frames_ = frames
+        if immortal is not None:
+            self._immortal_ = immortal
         if limit is not None:
             self._limit_ = limit
+        if maxobjs is not None:
+            if maxobjs < 0:
+                raise _OptionError(self.set, maxobjs=maxobjs)
+            self._maxobjs_ = int(maxobjs)
+        if sample is not None:
+            # no variance and error bound from a single item
+            if not (isinstance(sample, int) and (sample == 0 or sample > 1)) and \
+               not (isinstance(sample, float) and 0 < sample < 1):
+                raise _OptionError(self.set, sample=sample)
+            self._sample_ = sample
         if stats is not None:
             if stats < 0:
                 raise _OptionError(self.set, stats=stats)
@@ -2357,12 +4668,23 @@ class Asizer(object):
             self._cutoff_ = int(cutoff) if cutoff else c
             self._stats_ = s
             self._profile = s > 1  # profile types
+        if top is not None:
+            if top < 1:
+                raise _OptionError(self.set, top=top)
+            self._top_ = int(top)
+
+    @property
+    def shared(self):
+        '''Get the number of bytes in buffers shared by several
+           buffer exporters and sized only once so far (int).
+        '''
+        return self._buffers.sharing()
 
     @property
     def sized(self):
         '''Get the number objects sized so far (int).
         '''
-        return sum(1 for v in _values(self._seen) if v > 0)
+        return self._seen.counts()[1]
 
     @property
     def stats(self):
@@ -2370,12 +4692,31 @@ class Asizer(object):
         '''
         return self._stats_  # + (self._cutoff_ * 0.01)
 
+    @property
+    def top(self):
+        '''Get the number of largest objects ranked (int).
+        '''
+        return self._top_
+
     @property
     def total(self):
         '''Get the total size (in bytes) accumulated so far.
         '''
         return self._total
 
+    @property
+    def truncated(self):
+        '''Get whether the budget of the last call was
+           exhausted and the sizes are partial (bool).
+        '''
+        return self._truncated
+
+    @property
+    def visited(self):
+        '''Get the number of objects sized by the last call (int).
+        '''
+        return self._visited
+
 
 # Public functions
 
@@ -2414,7 +4755,392 @@ def amapped(percentage=None):
 
 
 _amapped = 0.01  # 0 <= percentage <= 1.0
-_asizer  = Asizer()
+
+
+def acached(maxobjs=None, clear=False):
+    '''Set/get the maximum number of objects in the cache
+       of sizes of immutable objects, see option *cache*.
+
+       Sets the new maximum if not None, clears the cache
+       if *clear* is True and returns the previous maximum.
+    '''
+    m = _cache.maxobjs
+    if maxobjs is not None:
+        _cache.resize(max(0, int(maxobjs)))
+    if clear:
+        _cache.clear()
+    return m
+
+
+def atasks(loop=None, group=False, **opts):
+    '''Return a list of 3-tuples (size, name, task) for every task
+       of the running or the given asyncio event *loop*, largest first,
+       with *name* the qualified name of the task's coroutine.
+
+       The size of a task includes its coroutine chain, the locals of
+       the coroutine frames and the awaited futures, but not the event
+       loop.  Objects shared by several tasks are sized only once.
+
+       If *group* is True, return a list of 3-tuples (size, number,
+       name) per coroutine name instead, largest first.
+
+       The available options and defaults are:
+
+            *align=8*      -- size alignment
+
+            *code=False*   -- incl. (byte)code size
+
+            *derive=False* -- derive from super type
+
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *ignored=True* -- ignore certain types
+
+            *immortal=True* -- incl. immortal and interned objects
+
+            *infer=False*  -- try to infer types
+
+            *limit=100*    -- recursion limit
+
+       See function **asizeof** for a description of the options.
+    '''
+    from asyncio import all_tasks
+    ts = all_tasks(loop)
+    a = _asizers.get()
+    try:
+        a.reset(**opts)
+        r = a.atasks(*ts, group=group)
+    finally:
+        _asizers.put(a)
+    return r
+
+
+def aregister(typ, flat=None, leng=None, refs=None, base=0, item=0):
+    '''Register a typedef for sizing the instances of *typ*,
+       typically a third-party class, replacing any existing one.
+
+            *flat* -- callable returning the flat size of an
+                      instance in bytes, excludes *leng*, *base*
+                      and *item*
+
+            *leng* -- callable returning the length of an
+                      instance, its number of items
+
+            *refs* -- callable returning an iterable over the
+                      referents of an instance to be sized
+
+            *base* -- basic size of an instance in bytes,
+                      default ``typ.__basicsize__``
+
+            *item* -- item size in bytes, default ``typ.__itemsize__``
+
+       The flat size of an instance is *flat(obj)* or *base* plus
+       *item* times *leng(obj)* if specified, otherwise *base*.
+       Other packages can register typedefs lazily through an
+       entry point in group ``pympler.typedefs`` named after the
+       fully qualified class name, like ``pandas.DataFrame =
+       package.module:func``.  The first time an instance of that
+       class or a subclass is sized, *func* is called with the
+       type and should return a dict of the keyword arguments
+       for this function or None.
+    '''
+    v = _Typedef(**_plugin_kwds(typ, flat=flat, leng=leng, refs=refs,
+                                     base=base, item=item))
+    with _typedefs_lock:
+        _typedefs.pop(typ, None)
+        v.save(typ)
+
+
+class _Asizers(threading.local):
+    '''Pool of **Asizer** instances for the module functions,
+       one pool per thread and reentrant within each thread.
+    '''
+    def __init__(self):
+        self.idle = []
+
+    def get(self):
+        '''Get an idle or a new **Asizer**.
+        '''
+        return self.idle.pop() if self.idle else Asizer()
+
+    def put(self, asizer):
+        '''Clear the **Asizer** and make it idle again.
+        '''
+        asizer._clear()
+        self.idle.append(asizer)
+
+
+_asizers = _Asizers()
+
+
+_fork_timeout = 60  # seconds, see option *timeout*
+
+
+def _forked(func, *args, timeout=_fork_timeout, **kwds):
+    '''Return ``func(*args, **kwds)`` called in a forked child process.
+
+       The child works on a copy-on-write image of the heap and
+       returns the result, which must be marshallable, through a
+       pipe.  Other threads in the caller are paused only for
+       the fork.  Where fork is not available, *func* is called
+       in-process.  Raise a RuntimeError if the child fails or a
+       TimeoutError if it does not return the result within
+       *timeout* seconds.
+    '''
+    if _fork is None:
+        return func(*args, **kwds)
+    sys.stdout.flush()  # not in the child
+    sys.stderr.flush()
+    r, w = pipe()
+    try:
+        with _typedefs_lock:  # not held by another thread
+            pid = _fork()
+    except BaseException:
+        close(r)
+        close(w)
+        raise
+    if not pid:  # child, never returns
+        x = 1
+        try:
+            close(r)
+            try:
+                b = _dumps((True, func(*args, **kwds)))
+            except BaseException as e:
+                b = _dumps((False, '%s: %s' % (_nameof(type(e)), e)))
+            with fdopen(w, 'wb') as f:
+                f.write(b)
+            x = 0
+        finally:
+            _exit(x)
+    close(w)
+    bs, t = [], _timer() + timeout
+    try:
+        while True:
+            z = t - _timer()
+            if z <= 0 or not select([r], [], [], z)[0]:
+                kill(pid, SIGKILL)
+                bs = None
+                break
+            b = read(r, 1 << 16)
+            if not b:  # EOF
+                break
+            bs.append(b)
+    finally:
+        close(r)
+        waitpid(pid, 0)
+    if bs is None:
+        raise TimeoutError('forked %s timed out after %s seconds' % (_nameof(func), timeout))
+    b = b''.join(bs)
+    ok, r = _loads(b) if b else (False, 'no result')
+    if not ok:
+        raise RuntimeError('forked %s failed: %s' % (_nameof(func), r))
+    return r
+
+
+def abaseline(*roots, **opts):
+    '''Return an **Abaseline** instance with the ids of all objects
+       reachable from the *roots* passed as positional arguments or
+       from all modules in ``sys.modules``, for option *baseline*.
+
+       The baseline is computed once and sizing with option *baseline*
+       treats the objects in it as seen before, without walking any of
+       them.  Use methods **update** and **refresh** of the returned
+       **Abaseline** instance to add new roots respectively rebuild it.
+
+       The available options and defaults are:
+
+            *code=False*   -- incl. (byte)code size
+
+            *derive=False* -- derive from super type
+
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *frames=False* -- ignore stack frame objects
+
+            *ignored=True* -- ignore certain types
+
+            *immortal=True* -- incl. immortal and interned objects
+
+            *infer=False*  -- try to infer types
+
+            *limit=100*    -- recursion limit
+
+       See function **asizeof** for a description of the options.
+    '''
+    return Abaseline(roots, opts)
+
+
+def amodules(*modules, **opts):
+    '''Return a list of 3-tuples (exclusive, shared, name) for the
+       modules passed as positional arguments or for all modules in
+       ``sys.modules``, the largest *exclusive* size first.
+
+       The *exclusive* size of a module is the size of all objects
+       reachable only from that module, the size freed if the module
+       were dropped.  The *shared* size is the size of all objects
+       reachable from that module and from other modules.  Objects
+       shared by several modules are sized once.
+
+       The available options and defaults are:
+
+            *align=8*      -- size alignment
+
+            *code=False*   -- incl. (byte)code size
+
+            *derive=False* -- derive from super type
+
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *frames=False* -- ignore stack frame objects
+
+            *ignored=True* -- ignore certain types
+
+            *immortal=True* -- incl. immortal and interned objects
+
+            *infer=False*  -- try to infer types
+
+            *limit=100*    -- recursion limit
+
+       See function **asizeof** for a description of the options.
+    '''
+    a = _asizers.get()
+    try:
+        a.reset(**opts)
+        r = a.amodules(*modules)
+    finally:
+        _asizers.put(a)
+    return r
+
+
+def apaths(obj, n=10, **opts):
+    '''Return a list of up to *n* **Asized** instances, each the
+       path from *obj* to one of the objects heaviest in *obj*,
+       largest first.
+
+       Each path ends at an object with no referent attributed more
+       than half its size.  The *size* and *flat* of each **Asized**
+       instance along the path is the size attributed to that edge.
+
+       The available options and defaults are:
+
+            *align=8*      -- size alignment
+
+            *clip=80*      -- clip ``repr()`` strings
+
+            *code=False*   -- incl. (byte)code size
+
+            *derive=False* -- derive from super type
+
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *frames=False* -- ignore stack frame objects
+
+            *ignored=True* -- ignore certain types
+
+            *immortal=True* -- incl. immortal and interned objects
+
+            *infer=False*  -- try to infer types
+
+            *limit=100*    -- recursion limit
+
+       See function **asizeof** for a description of the options.
+    '''
+    a = _asizers.get()
+    try:
+        a.reset(**opts)
+        r = a.apaths(obj, n=n)
+    finally:
+        _asizers.put(a)
+    return r
+
+
+def aretained(*objs, **opts):
+    '''Return an **Aretained** instance with the dominator tree
+       and the retained size of every object reachable from the
+       objects passed as positional arguments.
+
+       The available options and defaults are:
+
+            *align=8*      -- size alignment
+
+            *code=False*   -- incl. (byte)code size
+
+            *derive=False* -- derive from super type
+
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *frames=False* -- ignore stack frame objects
+
+            *ignored=True* -- ignore certain types
+
+            *immortal=True* -- incl. immortal and interned objects
+
+            *infer=False*  -- try to infer types
+
+            *limit=100*    -- recursion limit
+
+       If *all* is True and if no positional arguments are supplied.
+       build the dominator tree of all current gc objects, including
+       module, global and stack frame objects.
+
+       See function **asizeof** for a description of the options.
+    '''
+    t, p, x = _objs_opts_x(aretained, objs, **opts)
+    a = _asizers.get()
+    try:
+        a.reset(**p)
+        if x:  # don't size the _getobjects tuple
+            a.exclude_objs(t)
+        r = a.aretained(*t)
+    finally:
+        _asizers.put(a)
+    return r
+
+
+def ashared(*objs, matrix=False, **opts):
+    '''Return a list of 2-tuples (size, owners) for the objects passed
+       as positional arguments, largest first, with *owners* a tuple of
+       the indices of the objects reaching all objects of that total
+       size, e.g. ``(0,)`` for the size exclusive to the first object
+       and ``(0, 2)`` for the size shared by the first and third only.
+
+       The exclusive size of an object is the size freed if that object
+       were released.  Objects reachable from several of the given
+       objects are sized once, for those jointly, in a single traversal.
+
+       If *matrix* is True, return a list of lists with the size shared
+       by each pair of objects, including any other objects sharing
+       that size, and the exclusive size of each object on the diagonal.
+
+       The available options and defaults are:
+
+            *align=8*      -- size alignment
+
+            *code=False*   -- incl. (byte)code size
+
+            *derive=False* -- derive from super type
+
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *frames=False* -- ignore stack frame objects
+
+            *ignored=True* -- ignore certain types
+
+            *immortal=True* -- incl. immortal and interned objects
+
+            *infer=False*  -- try to infer types
+
+            *limit=100*    -- recursion limit
+
+       See function **asizeof** for a description of the options.
+    '''
+    a = _asizers.get()
+    try:
+        a.reset(**opts)
+        r = a.ashared(*objs, matrix=matrix)
+    finally:
+        _asizers.put(a)
+    return r
 
 
 def asized(*objs, **opts):
@@ -2427,24 +5153,42 @@ def asized(*objs, **opts):
 
             *align=8*      -- size alignment
 
+            *baseline=None* -- **Abaseline** of objects seen before
+
+            *budget=0*     -- time limit in seconds
+
+            *cache=False*  -- use cached sizes of immutable objects
+
             *code=False*   -- incl. (byte)code size
 
+            *compact=False* -- return compact AsizedTree instances
+
             *cutoff=10*    -- limit large objects or profiles stats
 
             *derive=False* -- derive from super type
 
             *detail=0*     -- Asized refs level
 
+            *exclude=()*   -- exclude types by module, base class or predicate
+
             *frames=False* -- ignore stack frame objects
 
             *ignored=True* -- ignore certain types
 
+            *immortal=True* -- incl. immortal and interned objects
+
             *infer=False*  -- try to infer types
 
             *limit=100*    -- recursion limit
 
+            *maxobjs=0*    -- object limit
+
+            *sample=0*     -- sample items of large containers
+
             *stats=0*      -- print statistics
 
+            *top=100*      -- number of largest objects ranked
+
        If only one object is given, the return value is the **Asized**
        instance for that object.  Otherwise, the length of the returned
        tuple matches the number of given objects.
@@ -2454,19 +5198,24 @@ def asized(*objs, **opts):
        Set *detail* to the desired referents level and *limit* to the
        maximum recursion depth.
 
+       If *compact* is True, **AsizedTree** instances are returned,
+       keeping the sizes and names of all referents in arrays, much
+       smaller than the **Asized** instances for larger *detail*.
+
        See function **asizeof** for descriptions of the other options.
     '''
-    _asizer.reset(**opts)
-    if objs:
-        t = _asizer.asized(*objs)
-        _asizer.print_stats(objs, opts=opts, sized=t)  # show opts as _kwdstr
-        _asizer._clear()
-    else:
-        t = ()
+    t, a = (), _asizers.get()
+    try:
+        a.reset(**opts)
+        if objs:
+            t = a.asized(*objs)
+            a.print_stats(objs, opts=opts, sized=t)  # show opts as _kwdstr
+    finally:
+        _asizers.put(a)
     return t
 
 
-def asizeof(*objs, **opts):
+def asizeof(*objs, fork=False, timeout=_fork_timeout, **opts):
     '''Return the combined size (in bytes) of all objects passed
        as positional arguments.
 
@@ -2476,6 +5225,12 @@ def asizeof(*objs, **opts):
 
             *align=8*      -- size alignment
 
+            *baseline=None* -- **Abaseline** of objects seen before
+
+            *budget=0*     -- time limit in seconds
+
+            *cache=False*  -- use cached sizes of immutable objects
+
             *clip=80*      -- clip ``repr()`` strings
 
             *code=False*   -- incl. (byte)code size
@@ -2484,16 +5239,30 @@ def asizeof(*objs, **opts):
 
             *derive=False* -- derive from super type
 
+            *exclude=()*   -- exclude types by module, base class or predicate
+
+            *fork=False*   -- size in a forked process
+
             *frames=False* -- ignore stack frame objects
 
             *ignored=True* -- ignore certain types
 
+            *immortal=True* -- incl. immortal and interned objects
+
             *infer=False*  -- try to infer types
 
             *limit=100*    -- recursion limit
 
+            *maxobjs=0*    -- object limit
+
+            *sample=0*     -- sample items of large containers
+
             *stats=0*      -- print statistics
 
+            *timeout=60*   -- seconds to wait for a forked process
+
+            *top=100*      -- number of largest objects ranked
+
        Set *align* to a power of 2 to align sizes.  Any value less
        than 2 avoids size alignment.
 
@@ -2501,6 +5270,53 @@ def asizeof(*objs, **opts):
        size all current gc objects, including module, global and stack
        frame objects.
 
+       Set *budget* to a time limit in seconds and/or *maxobjs* to
+       the maximum number of objects to size.  If either is exceeded,
+       sizing stops and the partial size is returned.  The **Asizer**
+       *truncated*, *visited* and *pending* properties and the
+       *stats* summary show whether and how much was left unsized.
+
+       Set *sample* to an int *N* of 2 or more to size lists, tuples,
+       sets, frozensets and dicts with more than *N* items from
+       a random sample of *N* items or to a float between 0 and 1
+       to size large containers from that fraction of their items.
+       The size is extrapolated from the sampled items and the
+       **Asizer** *error* property or **AsizedEstimate** *error*
+       attribute holds the 95% error bound of the estimated size.
+
+       Option *baseline* is an **Abaseline** instance from function
+       **abaseline**.  Objects in the baseline are treated as seen
+       before and not sized, except the given objects.  Repeated calls
+       then size only the objects owned by the given objects and not
+       reachable from the baseline roots, e.g. all modules.
+
+       If *cache* is True, the total size of the referents of
+       immutable objects, like large tuples and frozensets and
+       frozen dataclass instances containing only immutable
+       objects all the way down, is cached and reused across
+       calls.  The cache is not used for *stats* nor with
+       excluded types.  See function **acached** to limit or
+       clear the cache.
+
+       The buffers of ``bytearray``, ``array.array`` and NumPy
+       arrays, views and slices are sized only once, by address
+       range, no matter how many views share them.  Objects like
+       ``memoryview`` and ``mmap`` never include the buffer, but
+       ``memoryview`` objects include the exporting object.  The
+       **Asizer** *shared* property and the *stats* summary show
+       the bytes of buffers shared.
+
+       If *fork* is True, the objects are sized in a forked child
+       process, using a copy-on-write image of the heap, and only
+       the combined size is returned.  Any *stats* are printed by
+       the child and no other sizing results are returned.  The
+       calling thread waits for the result, but other threads keep
+       running while sizing, for example with *all=True*.  If the
+       child fails or does not return the size within *timeout*
+       seconds, a RuntimeError respectively TimeoutError is raised,
+       without sizing the objects in-process.  Where fork is not
+       available, the objects are sized in-process.
+
        A positive *clip* value truncates all repr() strings to at
        most *clip* characters.
 
@@ -2510,9 +5326,19 @@ def asizeof(*objs, **opts):
        If *derive* is True, new types are handled like an existing
        (super) type provided there is one and only of those.
 
+       Option *exclude* excludes all objects of the types and classes
+       matching any of the given module name patterns like ``'django.*'``,
+       base classes or callables, called with the type or class and
+       returning True to exclude.  Each type is checked only once per
+       **Asizer** and the referents of excluded objects are not sized.
+
        By default certain base types like object, super, etc. are
        ignored.  Set *ignored* to False to include those.
 
+       Set *immortal* to False to skip immortal and interned objects
+       and other objects owned by the interpreter, like small ints,
+       singletons and empty strs and tuples, and their referents.
+
        If *infer* is True, new types are inferred from attributes
        (only implemented for dict types on callable attributes
        as get, has_key, items, keys and values).
@@ -2520,8 +5346,9 @@ def asizeof(*objs, **opts):
        Set *limit* to a positive value to accumulate the sizes of
        the referents of each object, recursively up to the limit.
        Using *limit=0* returns the sum of the flat sizes of the
-       given objects.  High *limit* values may cause runtime errors
-       and miss objects for sizing.
+       given objects.  Referents are sized iteratively, not recursively,
+       hence even high *limit* values like ``sys.maxsize`` are safe for
+       deeply nested objects, like long linked lists.
 
        A positive value for *stats* prints up to 9 statistics, (1)
        a summary of the number of objects sized and seen and a list
@@ -2535,18 +5362,24 @@ def asizeof(*objs, **opts):
        *stats=1.10* shows the summary and the 10 largest objects,
        also the default.
 
+       Up to *top* largest objects are ranked, overall and per type,
+       see the **Asizer** *largest* method.
+
        See this module documentation for the definition of flat size.
     '''
+    if fork:
+        return _forked(asizeof, *objs, timeout=timeout, **opts)
     t, p, x = _objs_opts_x(asizeof, objs, **opts)
-    _asizer.reset(**p)
-    if t:
-        if x:  # don't size, profile or rank _getobjects tuple
-            _asizer.exclude_objs(t)
-        s = _asizer.asizeof(*t)
-        _asizer.print_stats(objs=t, opts=opts)  # show opts as _kwdstr
-        _asizer._clear()
-    else:
-        s = 0
+    s, a = 0, _asizers.get()
+    try:
+        a.reset(**p)
+        if t:
+            if x:  # don't size, profile or rank _getobjects tuple
+                a.exclude_objs(t)
+            s = a.asizeof(*t)
+            a.print_stats(objs=t, opts=opts)  # show opts as _kwdstr
+    finally:
+        _asizers.put(a)
     return s
 
 
@@ -2560,6 +5393,12 @@ def asizesof(*objs, **opts):
 
             *align=8*      -- size alignment
 
+            *baseline=None* -- **Abaseline** of objects seen before
+
+            *budget=0*     -- time limit in seconds
+
+            *cache=False*  -- use cached sizes of immutable objects
+
             *clip=80*      -- clip ``repr()`` strings
 
             *code=False*   -- incl. (byte)code size
@@ -2568,16 +5407,26 @@ def asizesof(*objs, **opts):
 
             *derive=False* -- derive from super type
 
+            *exclude=()*   -- exclude types by module, base class or predicate
+
             *frames=False* -- ignore stack frame objects
 
             *ignored=True* -- ignore certain types
 
+            *immortal=True* -- incl. immortal and interned objects
+
             *infer=False*  -- try to infer types
 
             *limit=100*    -- recursion limit
 
+            *maxobjs=0*    -- object limit
+
+            *sample=0*     -- sample items of large containers
+
             *stats=0*      -- print statistics
 
+            *top=100*      -- number of largest objects ranked
+
        See function **asizeof** for a description of the options.
 
        The length of the returned tuple equals the number of given
@@ -2585,13 +5434,14 @@ def asizesof(*objs, **opts):
 
        The size of duplicate and ignored objects will be zero.
     '''
-    _asizer.reset(**opts)
-    if objs:
-        t = _asizer.asizesof(*objs)
-        _asizer.print_stats(objs, opts=opts, sizes=t)  # show opts as _kwdstr
-        _asizer._clear()
-    else:
-        t = ()
+    t, a = (), _asizers.get()
+    try:
+        a.reset(**opts)
+        if objs:
+            t = a.asizesof(*objs)
+            a.print_stats(objs, opts=opts, sizes=t)  # show opts as _kwdstr
+    finally:
+        _asizers.put(a)
     return t
 
 
@@ -2603,7 +5453,8 @@ def _typedefof(obj, save=False, **opts):
     if not v:  # new typedef
         v = _typedef(obj, **opts)
         if save:
-            _typedefs[k] = v
+            with _typedefs_lock:
+                v = _typedefs.setdefault(k, v)
     return v
 
 
@@ -2693,7 +5544,10 @@ def named_refs(obj, **opts):
         if v and callable(v):
             for r in v(obj, True):
                 try:
-                    rs.append((r.name, r.ref))
+                    n = r.name
+                    if type(n) is tuple:
+                        n = _lazyname(n)
+                    rs.append((n, r.ref))
                 except AttributeError:
                     pass
     return rs
@@ -2707,13 +5561,19 @@ def refs(obj, **opts):
     v = _typedefof(obj, **opts)
     if v:
         v = v.refs
+        if v is _managed_refs:  # incl. the values as a dict
+            r = _managed_items(obj)
+            if r is not None:
+                return chain((dict(r),), v(obj, False))
         if v and callable(v):
             v = v(obj, False)
     return v
 
 
-__all__ = [_nameof(_) for _ in (Asized, Asizer,  # classes
-                                adict, amapped, asized, asizeof, asizesof,
+__all__ = [_nameof(_) for _ in (Abaseline, Aretained, Asized, AsizedEstimate, AsizedTree,
+                                Asizer,  # classes
+                                abaseline, acached, adict, amapped, amodules, apaths, aregister, aretained,
+                                ashared, asized, asizeof, asizesof, atasks,
                                 basicsize, flatsize, itemsize, leng, refs)]
 
 if __name__ == '__main__':
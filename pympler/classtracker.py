@@ -131,8 +131,10 @@ class TrackedObject(object):
         objects.
         """
         obj = self.ref()
+        # referents are kept in compact trees, see asizeof.AsizedTree
+        detail = self._resolution_level
         self.snapshots.append(
-            (ts, sizer.asized(obj, detail=self._resolution_level))
+            (ts, sizer.asized(obj, detail=detail, compact=detail > 0))
         )
         if obj is not None:
             self.repr = safe_repr(obj, clip=128)
@@ -533,7 +535,8 @@ class ClassTracker(object):
     snapshot_lock = Lock()
 
     def create_snapshot(self, description: str = '',
-                        compute_total: bool = False) -> None:
+                        compute_total: bool = False,
+                        fork: bool = False, timeout: float = 60) -> None:
         """
         Collect current per instance statistics and saves total amount of
         memory associated with the Python process.
@@ -541,7 +544,11 @@ class ClassTracker(object):
         If `compute_total` is `True`, the total consumption of all objects
         known to *asizeof* is computed. The latter might be very slow if many
         objects are mapped into memory at the time the snapshot is taken.
-        Therefore, `compute_total` is set to `False` by default.
+        Therefore, `compute_total` is set to `False` by default. Set `fork`
+        to `True` to compute the total in a forked child process from a
+        copy-on-write image of the heap, letting other threads run meanwhile.
+        If the child fails or does not return the total within `timeout`
+        seconds, a `RuntimeError` respectively `TimeoutError` is raised.
 
         The overhead of the `ClassTracker` structure is also computed.
 
@@ -574,7 +581,9 @@ class ClassTracker(object):
             snapshot = Snapshot(timestamp, str(description))
             snapshot.tracked_total = sizer.total
             if compute_total:
-                snapshot.asizeof_total = asizeof.asizeof(all=True, code=True)
+                snapshot.asizeof_total = asizeof.asizeof(all=True, code=True,
+                                                         fork=fork,
+                                                         timeout=timeout)
 
             # Compute overhead of all structures, use sizer to exclude tracked
             # objects(!)
@@ -13,9 +13,15 @@ import gc
 import inspect
 
 from pympler import muppy, summary
+from pympler.asizeof import _forked
 from pympler.util import compat
 
 
+def _summarize():
+    """Return a summary of all objects."""
+    return summary.summarize(muppy.get_objects())
+
+
 class SummaryTracker(object):
     """ Helper class to track changes between two summaries taken.
 
@@ -32,7 +38,7 @@ class SummaryTracker(object):
     need.
 
     """
-    def __init__(self, ignore_self=True):
+    def __init__(self, ignore_self=True, fork=False, timeout=60):
         """Constructor.
 
         The number of summaries managed by the tracker has a performance
@@ -41,8 +47,15 @@ class SummaryTracker(object):
 
         Keyword arguments:
         ignore_self -- summaries managed by this object will be ignored.
+        fork -- create summaries in a forked process, see create_summary.
+        timeout -- seconds to wait for a forked process.
         """
-        self.s0 = summary.summarize(muppy.get_objects())
+        self.fork = fork
+        self.timeout = timeout
+        if fork:
+            self.s0 = _forked(_summarize, timeout=timeout)
+        else:
+            self.s0 = _summarize()
         self.summaries = {}
         self.ignore_self = ignore_self
 
@@ -52,7 +65,21 @@ class SummaryTracker(object):
         See also the notes on ignore_self in the class as well as the
         initializer documentation.
 
+        If the tracker was created with fork=True, the summary is created
+        in a forked child process from a copy-on-write image of the heap
+        and passed back through a pipe. Other threads keep running while
+        the child walks the heap. If the child fails or does not return the
+        summary within the timeout, a RuntimeError respectively TimeoutError
+        is raised. Where fork is not available, the summary is created
+        in-process.
+
         """
+        if self.fork:
+            return _forked(self._create_summary, timeout=self.timeout)
+        return self._create_summary()
+
+    def _create_summary(self):
+        """Return a summary, created in the current process."""
         if not self.ignore_self:
             res = summary.summarize(muppy.get_objects())
         else:
@@ -1,8 +1,12 @@
 
+import abc
+import dataclasses
 import gc
 import os
 import sys
+import threading
 import unittest
+import warnings
 import weakref
 
 import pympler.asizeof as asizeof
@@ -234,11 +238,69 @@ class TypesTest(unittest.TestCase):
             size = asizeof.asizeof(x)
             self.assertTrue(size > 1000, size)
 
+    def test_numpy_views(self):
+        '''Test sizing the buffer of numpy views once.
+        '''
+        try:
+            from numpy import arange
+        except ImportError:
+            pass
+        else:
+            x = arange(100000)
+            vs = [x[i:i + 1000] for i in range(0, 100000, 1000)]
+            sizer = asizeof.Asizer()
+            size = sizer.asizeof(x, vs)
+            self.assertTrue(size < 2 * x.nbytes, (size, x.nbytes))
+            if asizeof._buffer_range:
+                self.assertEqual(sizer.shared, x.nbytes)
+
+    @unittest.skipIf(asizeof._buffer_range is None, 'no buffer addresses')
+    def test_buffers(self):
+        '''Test sizing buffers shared by memoryviews once.
+        '''
+        from array import array
+        b = bytearray(10000)
+        vs = [memoryview(b)[i:i + 100] for i in range(0, 10000, 100)]
+        sizer = asizeof.Asizer()
+        size = sizer.asizeof(vs)
+        self.assertEqual(size, asizeof.asizeof(b) +
+                               asizeof.asizeof(vs, *vs, limit=0))
+        self.assertEqual(sizer.shared, 10000)
+        a = array('d', range(1000))
+        v = memoryview(a)
+        sizer = asizeof.Asizer()
+        w = v[::2]
+        self.assertEqual(sizer.asizeof(a, v, w), asizeof.asizeof(a) +
+                         asizeof.asizeof(v, w, limit=0))
+        self.assertTrue(sizer.shared > len(a) * a.itemsize)
+        w.release()
+        self.assertEqual(asizeof.asizeof(w), asizeof.asizeof(w, limit=0))
+
 
 class FunctionTest(unittest.TestCase):
     '''Test exposed functions and parameters.
     '''
 
+    def test_ashared(self):
+        '''Test the exclusive and shared sizes of several objects.
+        '''
+        ab = [str(i) * 10 for i in range(100)]
+        bc = [str(i) * 20 for i in range(100)]
+        a, b, c = [b'a' * 5000, ab], [ab, bc], [bc]
+        c.append(b)  # nested
+        z = asizeof.asizeof
+        d = dict((o, s) for s, o in asizeof.ashared(a, b, c))
+        self.assertEqual(sorted(d), [(0,), (0, 1, 2), (1, 2), (2,)])
+        self.assertEqual(d[(0,)], z(a) - z(ab))
+        self.assertEqual(d[(0, 1, 2)], z(ab))
+        self.assertEqual(d[(1, 2)], z(b) - z(ab))
+        self.assertEqual(d[(2,)], asizeof.flatsize(c, align=8))
+        self.assertEqual(sum(d.values()), z(a, b, c))
+        m = asizeof.ashared(a, b, c, matrix=True)
+        self.assertEqual(m, [[d[(0,)], z(ab), z(ab)],
+                             [z(ab), 0, z(b)],
+                             [z(ab), z(b), d[(2,)]]])
+
     def test_asized(self):
         '''Test asizeof.asized()
         '''
@@ -259,6 +321,153 @@ class FunctionTest(unittest.TestCase):
         sized_objs = sizer.asized(Foo(3), Foo(4), detail=2)
         self.assertEqual(len(sized_objs), 2)
 
+    def test_asized_compact(self):
+        '''Test compact AsizedTree results.
+        '''
+        import copy
+        import pickle
+        objs = [Foo(i) for i in range(50)] + [{'a': [1.5, 'b']}, ThinFoo(1)]
+        sized = asizeof.asized(objs, detail=3)
+        tree = asizeof.asized(objs, detail=3, compact=True)
+        self.assertTrue(isinstance(tree, asizeof.AsizedTree))
+        self.assertEqual(tree.format(), sized.format())
+        self.assertEqual(str(tree), str(sized))
+        self.assertEqual(len(tree.refs), len(objs))
+        self.assertEqual(tree.refs[0].get('__dict__').size,
+                         sized.refs[0].get('__dict__').size)
+        self.assertTrue(len(tree._t.strs) < len(tree._t.sizes) // 2)  # interned
+        for t in (copy.deepcopy(tree), tree.asized()):
+            self.assertTrue(isinstance(t, asizeof.Asized))
+            self.assertEqual(t.format(), sized.format())
+        t = pickle.loads(pickle.dumps(tree))
+        self.assertEqual(t.format(), sized.format())
+        self.assertRaises(AttributeError, setattr, tree, 'size', 0)
+        sizer = asizeof.Asizer(compact=True)
+        a, b = sizer.asized(objs[0], objs[-1])
+        self.assertEqual(a.refs, ())
+        self.assertEqual(b.name, sized.refs[-1].name)
+        self.assertTrue(sizer.compact)
+        # built without any Asized instances, also if sampled
+        n, init = [], asizeof.Asized.__init__
+
+        def _init(self, *args, **kwds):
+            n.append(self)
+            init(self, *args, **kwds)
+
+        o = [str(i) * (i % 97) for i in range(20000)]
+        asizeof.Asized.__init__ = _init
+        try:
+            tree = asizeof.asized(objs, detail=3, compact=True)
+            e = asizeof.asized(o, compact=True, sample=500)
+        finally:
+            asizeof.Asized.__init__ = init
+        self.assertEqual(n, [])
+        self.assertEqual(tree.format(), sized.format())
+        self.assertTrue(e.error > 0)
+        self.assertTrue(isinstance(e.asized(), asizeof.AsizedEstimate))
+        self.assertEqual(e.asized().error, e.error)
+
+    def test_immortal(self):
+        '''Test skipping immortal and interned objects.
+        '''
+        imms = [None, True, 1, 255, ()]
+        objs = imms + [2**40, 'spam' * 100, Foo(1)]
+        a = asizeof.asizeof(objs)
+        b = asizeof.asizeof(objs, immortal=False)
+        self.assertTrue(a - b >= sum(map(asizeof.flatsize, imms)), (a, b))
+        self.assertTrue(b >= asizeof.asizeof(objs[-3:]) - 1024, (a, b))
+        ints = list(range(1000))  # sized in bulk
+        z = sum(asizeof.flatsize(i, align=8) for i in range(257))
+        self.assertEqual(asizeof.asizeof(ints) - z,
+                         asizeof.asizeof(ints, immortal=False))
+        r = asizeof.aretained(objs, immortal=False)
+        self.assertEqual(r.retained(None), 0)
+        self.assertTrue(r.total < asizeof.aretained(objs).total)
+        sizer = asizeof.Asizer(immortal=False)
+        self.assertFalse(sizer.immortal)
+        self.assertEqual(sizer.asizeof(objs), b)
+        # immortal objects are not counted as seen or sized
+        c = []
+        for xs in (objs, objs[len(imms):]):
+            sizer = asizeof.Asizer(immortal=False)
+            sizer.asizeof(xs)
+            c.append((sizer.seen, sizer.sized, sizer.visited))
+        self.assertEqual(c[0], c[1])
+        sizer = asizeof.Asizer(immortal=False)
+        sizer.asizeof(*imms)
+        self.assertEqual((sizer.seen, sizer.sized, sizer.visited), (0, 0, 0))
+
+    def test_baseline(self):
+        '''Test sizing only objects not in the baseline.
+        '''
+        shared = [str(i) * 10 for i in range(100)]
+        b = asizeof.abaseline(shared)
+        self.assertTrue(len(b) > 100, b)
+        self.assertTrue(id(shared[-1]) in b)
+        objs = [shared, Foo('spam' * 5)]
+        z = asizeof.asizeof(objs) - asizeof.asizeof(shared)
+        self.assertEqual(asizeof.asizeof(objs, baseline=b), z)
+        self.assertEqual(asizeof.asizesof(shared, baseline=b),
+                         (asizeof.flatsize(shared, align=8),))
+        sizer = asizeof.Asizer(baseline=b)
+        self.assertEqual(sizer.baseline, b)
+        self.assertEqual(sizer.asizeof(objs), z)
+        self.assertTrue(b.update(objs) >= 3, b)  # objs, Foo, str
+        self.assertEqual(asizeof.asizeof(objs, baseline=b),
+                         asizeof.flatsize(objs, align=8))
+        self.assertEqual(b.refresh(), len(b))
+        self.assertRaises(ValueError, asizeof.asizeof, objs, baseline=shared)
+
+    def test_exclude(self):
+        '''Test excluding types by module, base class or predicate.
+        '''
+        objs = [Foo(list(range(100))), ThinFoo('spam' * 100), OldFoo(None)]
+        z = asizeof.asizeof(objs)
+        f = asizeof.asizeof(objs[0])
+        for x in ([Foo], [lambda t: t is Foo], ['unittest.*', Foo]):
+            self.assertEqual(asizeof.asizeof(objs, exclude=x), z - f, x)
+        m = ThinFoo.__module__
+        self.assertEqual(asizeof.asizeof(objs, exclude=[m]),
+                         asizeof.flatsize(objs, align=8))
+        sizer = asizeof.Asizer(exclude=[Foo])
+        self.assertEqual(sizer.exclude, (Foo,))
+        self.assertEqual(sizer.asizeof(objs), z - f)
+        self.assertEqual(sizer.excluded, (Foo,))
+        sizer.set(exclude=())
+        foo = Foo(list(range(100)))
+        self.assertEqual(sizer.asizeof(foo), f)
+        self.assertRaises(ValueError, asizeof.asizeof, objs, exclude=[42])
+
+    @unittest.skipIf(asizeof._managed_values is None, 'no managed __dict__')
+    def test_managed_dict(self):
+        '''Test sizing instances without materializing the __dict__.
+        '''
+        def _dicts(o):
+            return [r for r in gc.get_referents(o) if type(r) is dict]
+
+        objs = [Foo(i) for i in range(20)]
+        s = asizeof.asizeof(objs, stats=1)
+        self.assertEqual([_dicts(o) for o in objs], [[]] * len(objs))
+        f = objs[-1]
+        self.assertTrue(asizeof.flatsize(f) > sys.getsizeof(f))
+        self.assertTrue({'data': 42} in asizeof.refs(Foo(42)))
+        self.assertEqual(asizeof.asizeof(objs), s)
+        # neither named referents nor paths materialize the __dict__
+        z = asizeof.asizeof(f)
+        for d in (1, 2):
+            a = asizeof.asized(f, detail=d)
+            self.assertEqual(a.size, z)
+            self.assertEqual(a.get('__dict__').flat, asizeof._managed_values(f))
+        self.assertEqual(asizeof.apaths(f)[0].size, z)
+        self.assertEqual(asizeof.asizeof(f), z)
+        self.assertEqual(_dicts(f), [])
+        self.assertTrue(asizeof.flatsize(f, align=1) > sys.getsizeof(f))
+        # once materialized, the __dict__ is sized instead
+        f.__dict__
+        self.assertEqual(len(_dicts(f)), 1)
+        self.assertEqual(asizeof.flatsize(f, align=1), sys.getsizeof(f))
+        self.assertEqual(asizeof.asized(f, detail=1).size, asizeof.asizeof(f))
+
     def test_asized_detail(self):
         foo = Foo(42)
         size1 = asizeof.asized(foo, detail=1)
@@ -282,6 +491,63 @@ class FunctionTest(unittest.TestCase):
         self.assertEqual(sized1_d1, sized2_d1)
         self.assertNotEqual(sized2_d1, sized2_d2)
 
+    def test_asized_names(self):
+        '''Test the lazy names of Asized referents.
+        '''
+        import copy
+        import pickle
+        d = {'a': 1.5, 2: 'bb', (3,): ThinFoo(4), 'f': Foo(5), 'l': [6]}
+        sized = asizeof.asized(d, detail=1)
+        self.assertEqual([type(r._name) is tuple for r in sized.refs],
+                         [False] * 5 + [True] + [False] * 4)  # ThinFoo only
+        c = copy.deepcopy(sized)
+        p = pickle.loads(pickle.dumps(sized))
+        self.assertTrue(all(type(r._name) is str for r in c.refs + p.refs))
+        t = d[(3,)]
+        names = ['[K] a', '[V] a: 1.5', '[K] 2', "[V] 2: 'bb'", '[K] (3,)',
+                 '[V] (3,): ' + repr(t), '[K] f', '[V] f: Foo',
+                 '[K] l', '[V] l: [6]']
+        self.assertEqual([r.name for r in sized.refs], names)
+        self.assertEqual([r.name for r in c.refs], names)
+        self.assertEqual([r.name for r in p.refs], names)
+        self.assertEqual(asizeof.asized(t, clip=10).name, repr(t)[:3] + '....' + repr(t)[-3:])
+        sized.name = 'd'
+        self.assertEqual(sized.name, 'd')
+
+    def test_asized_names_bounded(self):
+        '''Test the names of Asized referents use a bounded repr().
+        '''
+        class Rep(object):
+            n = 0
+
+            def __repr__(self):
+                Rep.n += 1
+                return 'Rep'
+
+        d = {'deep': [[[[Rep()]]]], 'wide': [Rep()] * 1000, 'w': 'w' * 1000}
+        sized = asizeof.asized(d, detail=1)
+        self.assertTrue(Rep.n < 20, Rep.n)
+        self.assertTrue(all(len(r.name) < 100 for r in sized.refs))
+        self.assertTrue(sized.get("[V] deep: [[[[...]]]]") is not None)
+
+    def test_asized_names_alive(self):
+        '''Test the names of Asized referents keep no objects alive.
+        '''
+        class Bar(object):
+            pass
+
+        b, t = b'x' * (1 << 20), Bar()
+        n, w, r = sys.getrefcount(b), weakref.ref(t), repr(t)
+        sized = asizeof.asized({'b': b, 't': t}, detail=1)
+        self.assertEqual(sys.getrefcount(b), n)
+        del t
+        gc.collect()
+        self.assertEqual(w(), None)
+        x = repr(b'x' * 100)
+        self.assertEqual([r.name for r in sized.refs],
+                         ['[K] b', '[V] b: ' + x[:38] + '....' + x[-38:],
+                          '[K] t', '[V] t: ' + asizeof._clip(r)])
+
     def test_asizesof(self):
         '''Test asizeof.asizesof()
         '''
@@ -342,6 +608,493 @@ class FunctionTest(unittest.TestCase):
         self.assertTrue(limit_sizes[1] < limit_sizes[2], limit_sizes)
         self.assertTrue(limit_sizes[2] < limit_sizes[3], limit_sizes)
 
+    def test_asizer_deep(self):
+        '''Test sizing deeply nested objects without recursion.
+        '''
+        n = sys.getrecursionlimit() * 10
+        chain = None
+        for _ in range(n):
+            chain = [chain]
+        sizer = asizeof.Asizer()
+        size = sizer.asizeof(chain, limit=n)
+        self.assertEqual(sizer.missed, 0)
+        self.assertEqual(size, n * asizeof.flatsize([None], align=8) +
+                               asizeof.flatsize(None, align=8))
+        self.assertEqual(asizeof.asizeof(chain, limit=2),
+                         3 * asizeof.flatsize([None], align=8))
+        sized = asizeof.asized(chain, detail=3, limit=n)
+        self.assertEqual(sized.size, size)
+        self.assertEqual(sized.refs[0].refs[0].refs[0].refs, ())
+
+    def test_asizer_fast(self):
+        '''Test the compiled typedef flat size and referents.
+        '''
+        objs = [1, 2**99, 1.5, 'spam', b'eggs', [1, 2], (3, 4), {5, 6},
+                {'a': 7}, Foo(8), ThinFoo(9), OldFoo(10), PseudoDict(),
+                bytearray(b'ham'), Foo.__dict__, len, asizeof]
+        for o in objs:
+            t = asizeof._typedef(o)
+            f, r = t.fast
+            s = t.base
+            if t.leng and t.item > 0:
+                s += t.leng(o) * t.item
+            if not t.xtyp:
+                s = sys.getsizeof(o, s)
+            if t.refs is asizeof._managed_refs:
+                s += asizeof._managed_values(o)
+            self.assertEqual(f(o), s, o)
+            if r and t.refs:
+                rs = list(t.refs(o, False))
+                if t.refs is asizeof._managed_refs:  # plus values, keys
+                    vs = asizeof._managed_items(o) or ()
+                    rs += [v for _, v in vs] + [k for k, _ in vs]
+                self.assertEqual(sorted(map(id, r(o))), sorted(map(id, rs)), o)
+
+    def test_asizer_leafs(self):
+        '''Test sizing large containers of leaf objects in bulk.
+        '''
+        ints = list(range(1000))
+        strs = tuple(str(i) for i in range(-100, 900))
+        objs = [ints, strs, set(ints[::2]), dict(zip(strs, ints)),
+                [1.5] * 100 + [ints[0]], [None, Foo(1)] * 50]
+        bulk = asizeof.Asizer()
+        b = bulk.asizeof(objs, stats=2, above=0)
+        _bulk_min = asizeof._bulk_min
+        try:  # size all objects one by one
+            asizeof._bulk_min = sys.maxsize
+            each = asizeof.Asizer()
+            e = each.asizeof(objs, stats=2, above=0)
+        finally:
+            asizeof._bulk_min = _bulk_min
+        self.assertEqual(b, e)
+        self.assertEqual(bulk.seen, each.seen)
+        self.assertEqual(bulk.sized, each.sized)
+        self.assertEqual(bulk.duplicate, each.duplicate)
+        self.assertEqual(bulk.total, each.total)
+
+    def test_asizer_histograms(self):
+        '''Test the size and length histograms per type.
+        '''
+        objs = [dict((str(j), j) for j in range(i % 50)) for i in range(500)]
+        objs.append(dict.fromkeys(range(1000)))
+        sizer = asizeof.Asizer()
+        sizer.asizeof(objs)
+        self.assertEqual(sizer.histograms(), {})  # no profiles
+        sizer = asizeof.Asizer(stats=2)
+        size = sizer.asizeof(objs)
+        hs = sizer.histograms()
+        self.assertEqual(sorted(hs), ['class NoneType', 'class dict',
+                                      'class int', 'class list', 'class str'])
+        for t, h in hs.items():
+            n = sum(c for _, _, c in h['flat'])
+            self.assertEqual(sum(c for _, _, c in h['deep']), n, t)
+            for lo, hi, _ in h['flat'] + h['deep'] + h['leng']:
+                self.assertTrue(lo <= hi < 2 * max(lo, 1), (t, lo, hi))
+        h = hs['class dict']
+        self.assertEqual(sum(c for _, _, c in h['leng']), 501)
+        self.assertEqual(h['leng'][0], (0, 0, 10))
+        self.assertEqual(h['leng'][-1], (512, 1023, 1))
+        self.assertEqual(hs['class list']['deep'][-1][:2],
+                         (1 << (size.bit_length() - 1), (1 << size.bit_length()) - 1))
+
+    def test_asizer_largest(self):
+        '''Test the top largest objects, overall and per type.
+        '''
+        ls = tuple([None] * (i * 10) for i in range(20))
+        bs = tuple(bytes(i * 100) for i in range(20))
+        sizer = asizeof.Asizer(top=5)
+        sizer.asizeof(ls, bs, stats=1, above=100)
+        self.assertEqual(sizer.top, 5)
+        r = sizer.largest()
+        self.assertEqual(len(r), 5)
+        self.assertEqual([s for s, _ in r], sorted((s for s, _ in r), reverse=True))
+        self.assertTrue(r[0][1] is bs)
+        r = sizer.largest(list)
+        self.assertEqual(r, [(asizeof.flatsize(o), o) for o in ls[:-6:-1]])
+        r = sizer.largest(bytes)
+        self.assertEqual(r, [(asizeof.asizeof(o), o) for o in bs[:-6:-1]])
+        self.assertEqual(sizer.largest(dict), [])
+        self.assertTrue(sizer.ranked > 30)
+        self.assertRaises(ValueError, sizer.set, top=0)
+
+    def test_asizer_seen(self):
+        '''Test compacting the objects seen.
+        '''
+        objs = [[i, str(i), (i, float(i))] for i in range(2000)]
+        objs.append(objs[:100])
+        plain = asizeof.Asizer()
+        p = plain.asizesof(objs, objs[-1], {'a': objs[0]})
+        _seen_max = asizeof._seen_max
+        try:  # compact early and often
+            asizeof._seen_max = 300
+            compact = asizeof.Asizer()
+            c = compact.asizesof(objs, objs[-1], {'a': objs[0]})
+        finally:
+            asizeof._seen_max = _seen_max
+        self.assertEqual(p, c)
+        self.assertTrue(compact._seen.ones > 0)
+        self.assertTrue(len(compact._seen) < len(plain._seen))
+        self.assertEqual(compact.seen, plain.seen)
+        self.assertEqual(compact.sized, plain.sized)
+        self.assertEqual(compact.duplicate, plain.duplicate)
+        self.assertTrue(0 < compact.overhead < plain.overhead)
+
+    def test_asizeof_reentrant(self):
+        '''Test nested asizeof calls.
+        '''
+        class Nested(object):
+            def __sizeof__(self):
+                return asizeof.asizeof([1, 2, 3])
+
+        objs = [Nested(), list(range(100)), {'a': Foo(1)}]
+        self.assertEqual(asizeof.asizeof(objs),
+                         asizeof.Asizer().asizeof(objs))
+
+    def test_asizeof_threads(self):
+        '''Test asizeof calls in several threads.
+        '''
+        objs = [[Foo(i), list(range(i * 100)), str(i) * i] for i in range(8)]
+        sizes = [asizeof.asizeof(o) for o in objs]
+        errs = []
+
+        def run(i):
+            for _ in range(20):
+                s = asizeof.asizeof(objs[i])
+                if s != sizes[i]:
+                    errs.append((i, s, sizes[i]))
+
+        ts = [threading.Thread(target=run, args=(i,)) for i in range(len(objs))]
+        for t in ts:
+            t.start()
+        for t in ts:
+            t.join()
+        self.assertEqual(errs, [])
+
+    def test_asizeof_cache(self):
+        '''Test sizes of immutable objects cached across calls.
+        '''
+        strs = tuple(str(i) for i in range(1000))
+        objs = [strs, frozenset(strs[:100]), [strs[:10], strs[500:]],
+                (strs, [1, 2, 3]) * 40]
+        for o in objs:
+            s = asizeof.asizeof(o)
+            self.assertEqual(asizeof.asizeof(o, cache=True), s)
+            self.assertEqual(asizeof.asizeof(o, cache=True), s)
+            self.assertEqual(asizeof.asizesof(o, strs, cache=True),
+                             asizeof.asizesof(o, strs))
+        self.assertEqual(asizeof.asizeof(objs, cache=True, limit=1),
+                         asizeof.asizeof(objs, limit=1))
+        self.assertTrue(asizeof._cache._objs > 1000)
+        m = asizeof.acached(10, clear=True)
+        self.assertEqual(asizeof.asizeof(strs, cache=True),
+                         asizeof.asizeof(strs))
+        self.assertEqual(asizeof._cache._objs, 0)  # too large
+        asizeof.acached(m)
+
+    def test_asizeof_cache_frozen(self):
+        '''Test cached sizes of frozen dataclass instances.
+        '''
+        @dataclasses.dataclass(frozen=True)
+        class Frozen(object):
+            a: tuple
+            b: str
+            c: frozenset
+
+        f = Frozen(tuple(range(20)), 'spam' * 50, frozenset(range(10)))
+        s = asizeof.asizeof(f)
+        for _ in range(3):
+            self.assertEqual(asizeof.asizeof(f, cache=True), s)
+            self.assertEqual(asizeof.asizeof(f), s)
+        self.assertTrue(id(f) in asizeof._cache._d)
+        if asizeof._ismanaged(Frozen):  # __dict__ not materialized
+            self.assertTrue(dict not in map(type, gc.get_referents(f)))
+
+    def test_asizeof_cache_leak(self):
+        '''Test the cache does not keep objects alive.
+        '''
+        t = tuple(str(i) for i in range(100))
+        n = sys.getrefcount(t)
+        s = asizeof.asizeof(t, cache=True)
+        self.assertEqual(sys.getrefcount(t), n)
+        self.assertTrue(id(t) in asizeof._cache._d)
+        self.assertEqual(asizeof.asizeof(t, cache=True), s)
+        self.assertEqual(sys.getrefcount(t), n)
+
+    def test_asizeof_sample(self):
+        '''Test estimating sizes from sampled container items.
+        '''
+        objs = [list(range(10000)), tuple(str(i) for i in range(5000)),
+                set(range(3000)), dict.fromkeys(range(2000), 1.5)]
+        for o in objs:
+            s = asizeof.asizeof(o)
+            sizer = asizeof.Asizer(sample=100)
+            e = sizer.asizeof(o)
+            self.assertEqual(sizer.sampled, 1)
+            self.assertTrue(abs(e - s) <= max(sizer.error, s // 20), (s, e))
+        # items of equal size estimate the exact size
+        o = [[i] for i in range(1000)]
+        sizer = asizeof.Asizer(sample=0.1)
+        self.assertEqual(sizer.asizeof(o), asizeof.asizeof(o))
+        self.assertEqual(sizer.error, 0)
+        # large, random item sizes
+        o = [str(i) * (i % 97) for i in range(20000)]
+        a = asizeof.asized(o, sample=500)
+        self.assertTrue(isinstance(a, asizeof.AsizedEstimate))
+        self.assertTrue(a.error > 0)
+        self.assertTrue(abs(a.size - asizeof.asizeof(o)) <= a.error * 2)
+        self.assertRaises(ValueError, asizeof.asizeof, o, sample=1.5)
+        for x in (-1, 1, True):  # no error bound from 1 item
+            self.assertRaises(ValueError, asizeof.asizeof, o, sample=x)
+        self.assertEqual(asizeof.asizeof(o, sample=False), asizeof.asizeof(o))
+
+    def test_amodules(self):
+        '''Test the exclusive and shared sizes of modules.
+        '''
+        import types
+        a, b, c = [types.ModuleType(n) for n in 'abc']
+        a.own = [b'a' * 5000]
+        b.own = [b'b' * 9000]
+        a.big = b.big = [str(i) * 10 for i in range(1000)]
+        c.b = b  # nested module
+        ms = dict((n, (x, s)) for x, s, n in asizeof.amodules(a, b, c, b))
+        self.assertEqual(sorted(ms), ['a', 'b', 'c'])
+        for n, o in (('a', a.own), ('b', b.own)):
+            x, s = ms[n]
+            self.assertTrue(x >= asizeof.asizeof(o), n)
+            self.assertTrue(x < asizeof.asizeof(o) + 1000, n)
+            self.assertTrue(s >= asizeof.asizeof(a.big), n)
+        self.assertTrue(ms['c'][0] < 1000)
+        ts = asizeof.amodules()
+        self.assertTrue(len(ts) > 3)
+        zs = [t[:2] for t in ts]
+        self.assertEqual(zs, sorted(zs, reverse=True))
+
+    def test_apaths(self):
+        '''Test the heaviest reference paths.
+        '''
+        def _leaf(p):
+            ns = []
+            while p.refs:
+                self.assertEqual(len(p.refs), 1)
+                p = p.refs[0]
+                ns.append(p.name)
+            return p, ns
+
+        big = [str(i) * 100 for i in range(1000)]
+        objs = {'a': [Foo(1), Foo(big)], 'b': list(range(100))}
+        ps = asizeof.apaths(objs, n=3)
+        self.assertEqual(len(ps), 3)
+        self.assertEqual(ps[0].size, asizeof.asizeof(objs))
+        p, ns = _leaf(ps[0])
+        self.assertEqual(p.size, asizeof.asizeof(big))
+        self.assertTrue(ns[0].startswith('[V] a: '), ns)
+        self.assertTrue(ns[-1].startswith('[V] data: '), ns)
+        zs = [_leaf(p)[0].size for p in ps]
+        self.assertEqual(zs, sorted(zs, reverse=True))
+        ps = asizeof.Asizer().apaths(objs, n=1, limit=0)
+        self.assertEqual(_leaf(ps[0])[1], [])  # objs is the culprit
+        self.assertRaises(ValueError, asizeof.apaths, objs, n=0)
+
+    def test_atasks(self):
+        '''Test sizing asyncio tasks per coroutine.
+        '''
+        import asyncio
+        shared = [b'x' * 4000]
+
+        async def hold(n):
+            buf = [bytes(1000) for _ in range(n)]
+            ref = shared
+            await asyncio.sleep(10)
+            return buf, ref
+
+        async def main():
+            ts = [asyncio.create_task(hold(10)) for _ in range(3)]
+            await asyncio.sleep(0)
+            try:
+                return asizeof.atasks(), asizeof.atasks(group=True)
+            finally:
+                for t in ts:
+                    t.cancel()
+
+        ts, gs = asyncio.run(main())
+        self.assertEqual(len(ts), 4)  # incl. main
+        n = hold.__qualname__
+        zs = [z for z, q, _ in ts if q == n]
+        self.assertEqual(len(zs), 3)
+        self.assertTrue(min(zs) > 10 * 1000, zs)
+        self.assertTrue(max(zs) - min(zs) > 4000, zs)  # shared once
+        self.assertEqual(gs[0], (sum(zs), 3, n))
+        self.assertEqual(gs[-1][1:], (1, main.__qualname__))
+
+    def test_aretained(self):
+        '''Test retained sizes and dominators.
+        '''
+        x = [1.5, 2.5]
+        y = {'k': 'shared'}
+        a = [x, y]
+        b = [y]
+        r = asizeof.aretained(a, b)
+        self.assertEqual(r.total, asizeof.asizeof(a, b))
+        self.assertEqual(r.retained(a), asizeof.flatsize(a) + asizeof.asizeof(x))
+        self.assertEqual(r.retained(b), asizeof.flatsize(b))
+        self.assertEqual(r.retained(y), asizeof.asizeof(y))
+        self.assertEqual(r.flat(y), asizeof.flatsize(y))
+        self.assertTrue(r.dominator(x) is a)
+        self.assertTrue(r.dominator(y) is None)
+        self.assertEqual(r.retained([]), 0)
+        self.assertEqual(r.largest(1), [(r.retained(y), r.flat(y), y)])
+        t = dict((n, (s, c)) for s, c, _, n in r.types())
+        self.assertEqual(t['class list'], (r.retained(a) + r.retained(b), 3))
+        self.assertEqual(t['class float'], (2 * asizeof.flatsize(1.5), 2))
+        # retained by the outermost instance only
+        n = [[[1]]]
+        r = asizeof.aretained(n)
+        self.assertEqual(r.types()[0][:2], (asizeof.asizeof(n), 3))
+
+    def test_aregister(self):
+        '''Test registering typedefs for other classes.
+        '''
+        class Frame(object):
+            def __init__(self, n):
+                self.blocks = [list(range(n)), [str(i) for i in range(n)]]
+                self.cache = {'big': list(range(10 * n))}
+
+        f = Frame(100)
+        try:
+            asizeof.aregister(Frame, flat=lambda o: 96,
+                                     refs=lambda o: o.blocks)
+            self.assertEqual(asizeof.flatsize(f), 96)
+            self.assertEqual(asizeof.asizeof(f), 96 + asizeof.asizeof(f.blocks) -
+                             asizeof.asizeof(f.blocks, limit=0))
+            self.assertRaises(ValueError, asizeof.aregister, Frame,
+                              flat=len, leng=len)
+        finally:
+            asizeof._typedefs.pop(Frame, None)
+
+        class Meta(abc.ABC):  # metaclass other than type
+            def __init__(self, n):
+                self.blocks = list(range(n))
+
+        m = Meta(100)
+        try:
+            asizeof.aregister(Meta, flat=lambda o: 96)
+            self.assertEqual(asizeof.flatsize(m), 96)
+            self.assertEqual(asizeof.asizeof(m), 96)
+        finally:
+            asizeof._typedefs.pop(Meta, None)
+
+    def test_aregister_plugin(self):
+        '''Test registering typedefs lazily by entry points.
+        '''
+        class Block(object):
+            def __init__(self, n):
+                self.data = list(range(n))
+
+        class SubBlock(Block):
+            pass
+
+        class EntryPoint(object):
+            loaded = []
+
+            def load(self):
+                return self.typedef
+
+            def typedef(self, typ):
+                self.loaded.append(typ)
+                return dict(leng=lambda o: len(o.data), item=8,
+                            refs=lambda o: (o.data,))
+
+        e = EntryPoint()
+        n = '%s.%s' % (Block.__module__, Block.__qualname__)
+        _plugins = asizeof._plugins
+        try:
+            asizeof._plugins = {n: e}
+            b = SubBlock(10)
+            self.assertEqual(e.loaded, [])
+            s = asizeof.asizeof(b)
+            self.assertEqual(e.loaded, [SubBlock])
+            self.assertEqual(asizeof.flatsize(b),
+                             asizeof.basicsize(b) + 8 * 10)
+            self.assertEqual(s, asizeof.flatsize(b) + asizeof.asizeof(b.data))
+            asizeof.asizeof(SubBlock(5))
+            self.assertEqual(e.loaded, [SubBlock])  # once
+            asizeof._plugins = None  # not loaded for built-in types
+            self.assertFalse(asizeof._plugin(threading.Thread, None))
+            self.assertEqual(asizeof._plugins, None)
+        finally:
+            asizeof._plugins = _plugins
+            asizeof._typedefs.pop(SubBlock, None)
+
+    def test_asizer_budget(self):
+        '''Test sizing limited by time or number of objects.
+        '''
+        objs = [[i, str(i), (i, float(i))] for i in range(2000)]
+        sizer = asizeof.Asizer()
+        size = sizer.asizeof(objs)
+        self.assertFalse(sizer.truncated)
+        self.assertEqual(sizer.pending, 0)
+        self.assertEqual(sizer.visited, sizer.sized)
+        sizer = asizeof.Asizer(maxobjs=100)
+        s = sizer.asizeof(objs)
+        self.assertTrue(0 < s < size, (s, size))
+        self.assertTrue(sizer.truncated)
+        self.assertEqual(sizer.visited, 100)
+        self.assertTrue(sizer.pending > 1900, sizer.pending)
+        t = sizer.asizesof(objs[-1], objs[-2])  # next call
+        self.assertFalse(sizer.truncated)
+        self.assertEqual(sum(t), asizeof.asizeof(objs[-1], objs[-2]))
+        sizer = asizeof.Asizer(budget=1e-6)
+        a = sizer.asized(objs, [1, 2], detail=1)
+        self.assertTrue(sizer.truncated)
+        self.assertTrue(a[0].size < size)
+        self.assertEqual(a[1].size, 0)
+        self.assertRaises(ValueError, asizeof.asizeof, objs, budget=-1)
+        # many small objs
+        objs = [object() for _ in range(300000)]
+        sizer = asizeof.Asizer(budget=1e-3)
+        sizer.asizesof(*objs)
+        self.assertTrue(sizer.truncated)
+        self.assertTrue(sizer.pending > 0)
+        self.assertEqual(sizer.visited + sizer.pending, len(objs))
+        sizer = asizeof.Asizer(maxobjs=100)
+        sizer.asizesof(*objs)
+        self.assertEqual(sizer.visited, 100)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires os.fork')
+    def test_asizeof_fork(self):
+        '''Test sizing in a forked process.
+        '''
+        objs = [[i, str(i), (i, float(i))] for i in range(1000)]
+        pid = os.getpid()
+        self.assertEqual(asizeof.asizeof(objs, fork=True),
+                         asizeof.asizeof(objs))
+        self.assertTrue(asizeof.asizeof(all=True, fork=True) > 0)
+        self.assertRaises(RuntimeError, asizeof.asizeof, objs, fork=True,
+                          budget=-1)
+        self.assertEqual(os.getpid(), pid)
+        # module locks held by another thread at fork time
+        objs.append(tuple(str(i) for i in range(100)))  # cached
+        s = asizeof.asizeof(objs)
+        for lock in (asizeof._typedefs_lock, asizeof._cache._lock):
+            held, done = threading.Event(), threading.Event()
+
+            def _hold():
+                with lock:
+                    held.set()
+                    done.wait(0.5)
+
+            t = threading.Thread(target=_hold)
+            t.start()
+            held.wait()
+            try:
+                self.assertEqual(asizeof.asizeof(objs, cache=True, fork=True,
+                                                 timeout=10), s)
+            finally:
+                done.set()
+                t.join()
+        self.assertRaises(TimeoutError, asizeof.asizeof, objs, fork=True,
+                          timeout=1e-9)
+
     def test_basicsize(self):
         '''Test asizeof.basicsize()
         '''
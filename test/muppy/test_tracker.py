@@ -119,6 +119,21 @@ class TrackerTest(unittest.TestCase):
         self.assertNotEqual(len(tmp), 0)
 
 
+    @unittest.skipUnless(hasattr(os, 'fork'), "Requires os.fork")
+    def test_stracker_fork(self):
+        """Test that summaries created in a forked process include the
+        most recent objects and are comparable to in-process summaries.
+
+        """
+        stracker = tracker.SummaryTracker(fork=True, timeout=30)
+        sn = stracker.create_summary()
+        self.assertEqual(self._contains_indicator(sn), None)
+        o = self._get_indicator()
+        sn = stracker.create_summary()
+        self.assertEqual(self._contains_indicator(sn), 1)
+        self.assertEqual(self._contains_indicator(stracker.diff()), 1)
+
+
     def test_stracker_store_summary(self):
         """Test that a summary is stored under the correct key and most
         recent objects are included.
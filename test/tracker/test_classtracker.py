@@ -1,3 +1,4 @@
+import os
 import sys
 import time
 import unittest
@@ -200,6 +201,16 @@ class SnapshotTestCase(unittest.TestCase):
             self.assertEqual(fp_with_total.total, fp_with_total.asizeof_total)
             self.assertEqual(fp.total, fp.tracked_total)
 
+    @unittest.skipUnless(hasattr(os, 'fork'), "Requires os.fork")
+    def test_snapshot_fork(self):
+        """Test computing the total in a forked process.
+        """
+        foo = Foo()
+        self.tracker.track_object(foo)
+        self.tracker.create_snapshot(compute_total=True, fork=True)
+        fp = self.tracker.snapshots[0]
+        self.assertTrue(fp.asizeof_total > 0, fp.asizeof_total)
+        self.assertTrue(fp.asizeof_total >= fp.tracked_total)
 
     def test_desc(self):
         """Test snapshot label.
@@ -0,0 +1,12 @@
+'''Benchmarks for the sizing functions of module asizeof.
+
+   Run all benchmarks from a checkout, in the top directory, and
+   write the results as JSON to a file with ``python -m
+   tools.benchmark -o results.json`` and compare the results of two
+   versions with ``python -m tools.benchmark -c old.json new.json``.
+   See ``python -m tools.benchmark --help`` for all options.  This
+   package is not installed with Pympler.
+
+   The heaps are built from the synthetic generators in module
+   tools.benchmark.heaps, reproducibly for a given *seed*.
+'''
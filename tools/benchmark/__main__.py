@@ -0,0 +1,136 @@
+'''Time the asizeof sizing functions on synthetic heaps.
+
+   For each heap and function, print or write as JSON the size,
+   the number of objects sized, the best time of *repeat* runs,
+   the throughput in objects per second and the peak memory
+   allocated while sizing, measured in a separate run with
+   tracemalloc.
+'''
+import argparse
+import gc
+import json
+import platform
+import sys
+import tracemalloc
+
+from time import perf_counter
+
+from tools.benchmark.heaps import generators
+from pympler import __version__, asizeof
+
+
+def _asizeof(a, h, detail):
+    return a.asizeof(h)
+
+
+def _asizesof(a, h, detail):
+    return sum(a.asizesof(*(h if isinstance(h, list) else [h])))
+
+
+def _asized(a, h, detail):
+    return a.asized(h, detail=detail).size
+
+
+functions = dict(asizeof=_asizeof, asizesof=_asizesof, asized=_asized)
+
+
+def bench(heap, func, n=10000, seed=0, repeat=3, detail=2, limit=sys.maxsize):
+    '''Return a dict with the results of sizing *heap* with *func*
+       or *None* if the heap can not be built.
+    '''
+    h = generators[heap](n, seed=seed)
+    if h is None:
+        return None
+    f, a = functions[func], asizeof.Asizer()
+    a.reset(limit=limit)
+    f(a, h, detail)  # warmup, create typedefs
+    t = []
+    for _ in range(repeat):
+        a.reset(limit=limit)
+        gc.collect()
+        s = perf_counter()
+        z = f(a, h, detail)
+        t.append(perf_counter() - s)
+    c, t = a.sized, min(t)
+    # peak memory in a separate run, tracemalloc slows sizing
+    a.reset(limit=limit)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        f(a, h, detail)
+        p = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return dict(heap=heap, func=func, n=n, size=z, objects=c, seconds=t,
+                objs_per_sec=int(c / t) if t > 0 else 0, peak=p)
+
+
+def compare(old, new, file=sys.stdout):
+    '''Print the throughput and peak memory ratios of the *new*
+       versus the *old* results, both JSON file names.
+    '''
+    def _load(name):
+        with open(name) as f:
+            d = json.load(f)
+        return d, dict(((r['heap'], r['func']), r) for r in d['results'])
+
+    o, os_ = _load(old)
+    n, ns = _load(new)
+    print('%-24s %14s %14s %7s %7s' % ('%s vs %s' % (n['version'], o['version']),
+          'objs/sec', 'peak', 'speed', 'memory'), file=file)
+    for k, r in sorted(ns.items()):
+        q = os_.get(k, None)
+        if q:
+            s = r['objs_per_sec'] / float(q['objs_per_sec'] or 1)
+            m = r['peak'] / float(q['peak'] or 1)
+            print('%-24s %14d %14d %6.2fx %6.2fx' % ('%s.%s' % k,
+                  r['objs_per_sec'], r['peak'], s, m), file=file)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='python -m tools.benchmark',
+                                description=__doc__.split('\n')[0])
+    p.add_argument('-c', '--compare', nargs=2, metavar=('OLD', 'NEW'),
+                   help='compare the results in two JSON files')
+    p.add_argument('-d', '--detail', type=int, default=2,
+                   help='asized detail level (%(default)s)')
+    p.add_argument('-f', '--func', action='append', choices=sorted(functions),
+                   help='function(s) to time (all)')
+    p.add_argument('-H', '--heap', action='append', choices=sorted(generators),
+                   help='heap(s) to size (all)')
+    p.add_argument('-l', '--limit', type=int, default=sys.maxsize,
+                   help='recursion limit (unlimited)')
+    p.add_argument('-n', type=int, default=10000,
+                   help='number of objects per heap (%(default)s)')
+    p.add_argument('-o', '--output', help='write JSON results to this file')
+    p.add_argument('-r', '--repeat', type=int, default=3,
+                   help='number of timed runs (%(default)s)')
+    p.add_argument('-s', '--seed', type=int, default=0,
+                   help='random seed (%(default)s)')
+    o = p.parse_args(argv)
+
+    if o.compare:
+        compare(*o.compare)
+        return
+
+    rs = []
+    for h in o.heap or sorted(generators):
+        for f in o.func or sorted(functions):
+            r = bench(h, f, n=o.n, seed=o.seed, repeat=o.repeat,
+                      detail=o.detail, limit=o.limit)
+            if r:
+                rs.append(r)
+                print('%-10s %-9s %9d objs %8.3f sec %10d objs/sec %12d peak' % (h,
+                      f, r['objects'], r['seconds'], r['objs_per_sec'], r['peak']))
+    if o.output:
+        d = dict(version=__version__, python=platform.python_version(),
+                 implementation=platform.python_implementation(),
+                 platform=platform.platform(), n=o.n, seed=o.seed,
+                 repeat=o.repeat, detail=o.detail, limit=o.limit,
+                 results=rs)
+        with open(o.output, 'w') as f:
+            json.dump(d, f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+'''Synthetic heap generators for the asizeof benchmarks.
+
+   Each generator takes the number of objects *n* and a
+   *seed* and returns the root of a heap of about *n*
+   objects, the same heap for the same *n* and *seed*.
+'''
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+__all__ = ['chain', 'cycles', 'generators', 'instances', 'ndarrays',
+           'slotted', 'wide']
+
+
+class Node(object):
+    '''Instance with a ``__dict__``.
+    '''
+    def __init__(self, i):
+        self.i = i
+        self.name = 'node%d' % (i,)
+        self.next = None
+
+
+class Slotted(object):
+    '''Instance with ``__slots__``.
+    '''
+    __slots__ = ('i', 'name', 'next')
+
+    def __init__(self, i):
+        self.i = i
+        self.name = 'slot%d' % (i,)
+        self.next = None
+
+
+def chain(n, seed=0):
+    '''A linked list of *n* nested 2-lists, *n* levels deep.
+    '''
+    r = None
+    for i in range(n // 2):
+        r = [i * 1000 + seed, r]
+    return r
+
+
+def cycles(n, seed=0, degree=4):
+    '''A random graph of about *n* dicts with *degree* references
+       each to other dicts, forming many reference cycles.
+    '''
+    g = random.Random(seed)
+    m = max(1, n // (degree + 2))
+    ns = [{'id': i * 1000 + seed} for i in range(m)]
+    for d in ns:
+        d['refs'] = [g.choice(ns) for _ in range(degree)]
+    return ns
+
+
+def instances(n, seed=0):
+    '''A list of *n* // 4 small class instances with a ``__dict__``.
+    '''
+    return [Node(i * 1000 + seed) for i in range(n // 4)]
+
+
+def ndarrays(n, seed=0):
+    '''A list of *n* // 4 NumPy arrays, each with a view or *None*
+       if NumPy is not installed.
+    '''
+    if numpy is None:
+        return None
+    g = numpy.random.RandomState(seed)
+    r = []
+    for i in range(n // 4):
+        a = g.random_sample(16 + i % 256)
+        r.append((a, a[::2]))
+    return r
+
+
+def slotted(n, seed=0):
+    '''A list of *n* // 3 small class instances with ``__slots__``.
+    '''
+    return [Slotted(i * 1000 + seed) for i in range(n // 3)]
+
+
+def wide(n, seed=0):
+    '''A single dict with *n* // 2 str keys and float values.
+    '''
+    g = random.Random(seed)
+    return dict(('k%d' % (i,), g.random()) for i in range(n // 2))
+
+
+generators = dict(chain=chain, cycles=cycles, instances=instances,
+                  ndarrays=ndarrays, slotted=slotted, wide=wide)